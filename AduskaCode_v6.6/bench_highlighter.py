@@ -0,0 +1,84 @@
+
+# -*- coding: utf-8 -*-
+"""Highlighting benchmark: the old one-regex-per-rule PythonHighlighter vs the single-pass tokenizer.
+
+    python bench_highlighter.py [lines]
+"""
+import os, sys, time
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtCore import QRegularExpression
+from PyQt5.QtGui import QSyntaxHighlighter, QTextDocument, QColor
+from PyQt5.QtWidgets import QApplication
+from core.highlighter import PythonHighlighter, fmt
+
+SAMPLE = '''
+class Example(Base):
+    """Docstring that spans
+    several lines with 'quotes' and # hashes.
+    """
+    LIMIT = 0x1F + 1.5e3
+
+    def method(self, value=None, *args, **kwargs):
+        # a comment with keywords: if else return
+        if value is not None and len(args) > 2:
+            return f"{value!r} and 'nested'" + r"raw\\path"
+        for i in range(10):
+            yield i * 2  # trailing comment
+        raise ValueError('bad value: %s' % value)
+'''
+
+
+class LegacyPythonHighlighter(QSyntaxHighlighter):
+    """The previous implementation, kept here as the baseline."""
+    def __init__(self, document):
+        super().__init__(document)
+        kw = ('and as assert break class continue def del elif else except False finally for from global '
+              'if import in is lambda None nonlocal not or pass raise return True try while with yield').split()
+        self.rules = [(QRegularExpression(rf"\b{w}\b"), fmt(QColor("#c586c0"), bold=True)) for w in kw]
+        self.rules.append((QRegularExpression(r"'[^'\\n]*'"), fmt(QColor("#ce9178"))))
+        self.rules.append((QRegularExpression(r"\"[^\"\\n]*\""), fmt(QColor("#ce9178"))))
+        self.rules.append((QRegularExpression(r"\b-?\d+(\.\d+)?([eE][+-]?\d+)?\b"), fmt(QColor("#b5cea8"))))
+        self.rules.append((QRegularExpression(r"\bclass\s+(\w+)"), fmt(QColor("#4ec9b0"), bold=True)))
+        self.rules.append((QRegularExpression(r"\bdef\s+(\w+)"), fmt(QColor("#dcdcaa"), bold=True)))
+        self.com_re = QRegularExpression(r"#.*")
+        self.com_fmt = fmt(QColor("#6a9955"), italic=True)
+
+    def highlightBlock(self, text):
+        for pattern, f in self.rules:
+            it = pattern.globalMatch(text)
+            while it.hasNext():
+                m = it.next()
+                self.setFormat(m.capturedStart(), m.capturedLength(), f)
+        it = self.com_re.globalMatch(text)
+        while it.hasNext():
+            m = it.next()
+            self.setFormat(m.capturedStart(), m.capturedLength(), self.com_fmt)
+
+
+def bench(cls, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        doc = QTextDocument(); doc.setPlainText(text)
+        hl = cls(doc)
+        t0 = time.perf_counter()
+        hl.rehighlight()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    chunk = SAMPLE.count("\n")
+    text = SAMPLE * (lines // chunk + 1)
+    app = QApplication.instance() or QApplication(sys.argv)
+    old = bench(LegacyPythonHighlighter, text)
+    new = bench(PythonHighlighter, text)
+    print(f"{text.count(chr(10))} lines")
+    print(f"legacy (one regex per rule): {old * 1000:9.1f} ms")
+    print(f"single-pass tokenizer:       {new * 1000:9.1f} ms")
+    print(f"speedup:                     {old / new:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+
+import os
+from functools import partial
+from PyQt5.QtCore import QObject, QCoreApplication, pyqtSignal
+
+
+class Buffer(QObject):
+    """A document with its path, encoding and highlighting, shared by every editor showing it.
+
+    Each view (CodeEditor) keeps its own cursor and scroll position. The buffer owns the
+    QTextDocument and is deleted, document and all, when its last view is destroyed.
+    """
+    released = pyqtSignal(object)   # the buffer, after its last view went away
+
+    def __init__(self, document):
+        super().__init__(QCoreApplication.instance())   # not owned by any one view
+        self.document = document
+        document.setParent(self)
+        self.views = []
+        self.file_path = None
+        self.encoding = "utf-8"
+        self.highlighter = None
+        self.language = None
+        self.lazy_highlight = None
+        self.recolor_pending = False
+        self.recolor_at = 0
+
+    def add_view(self, editor):
+        self.views.append(editor)
+        if len(self.views) == 2:
+            # the layout measures against the first view's viewport, which may close first
+            self.document.documentLayout().setPaintDevice(None)
+        editor.destroyed.connect(partial(self._view_gone, editor))
+        if self.lazy_highlight is not None: self.lazy_highlight.add_view(editor)
+
+    def _view_gone(self, editor, *_):
+        if editor in self.views: self.views.remove(editor)
+        if self.lazy_highlight is not None: self.lazy_highlight.remove_view(editor)
+        if not self.views:
+            try: self.released.emit(self); self.deleteLater()
+            except RuntimeError: pass   # application teardown
+
+
+def path_key(path) -> str:
+    return os.path.normcase(os.path.realpath(str(path)))
+
+
+class BufferRegistry:
+    """Open buffers by resolved path, so a file opened twice shares one document."""
+
+    def __init__(self):
+        self._by_key = {}
+
+    def get(self, path):
+        return self._by_key.get(path_key(path)) if path else None
+
+    def register(self, buffer):
+        """(Re-)index `buffer` under its current file_path, e.g. after Save As."""
+        for k in [k for k, b in self._by_key.items() if b is buffer]: del self._by_key[k]
+        if buffer.file_path:
+            self._by_key[path_key(buffer.file_path)] = buffer
+        if not getattr(buffer, "_registered", False):
+            buffer._registered = True
+            buffer.released.connect(self._forget)
+
+    def _forget(self, buffer):
+        for k in [k for k, b in self._by_key.items() if b is buffer]: del self._by_key[k]
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __iter__(self):
+        return iter(list(self._by_key.values()))
@@ -1,8 +1,13 @@
 
+import time
 from PyQt5.QtCore import Qt, QRect, QSize
 from PyQt5.QtGui import QColor, QPainter, QFont, QPalette, QTextCursor
 from PyQt5.QtWidgets import QPlainTextEdit, QWidget
-from core.highlighter import PythonHighlighter
+from core.grammars import grammar_for, create_highlighter
+from core.highlighter import BlockHighlighter
+from core.lazy_highlight import ViewportHighlighter
+from core.file_loader import ChunkedInsert
+from core.buffers import Buffer
 
 class LineNumberArea(QWidget):
     def __init__(self, editor):
@@ -13,16 +18,36 @@ class LineNumberArea(QWidget):
     def paintEvent(self, event):
         self.editor.line_number_area_paint_event(event)
 
+def _shared(name):
+    """An attribute that lives on the editor's Buffer, so all views of a file agree on it."""
+    return property(lambda self: getattr(self.buffer, name), lambda self, v: setattr(self.buffer, name, v))
+
+
 class CodeEditor(QPlainTextEdit):
-    def __init__(self, parent=None):
+    LARGE_DOC_CHARS = 256 * 1024   # above this, highlighting is viewport-first and time-sliced
+    theme = None                   # last theme applied by the main window; new editors start with it
+
+    file_path = _shared("file_path")
+    encoding = _shared("encoding")
+    highlighter = _shared("highlighter")
+    language = _shared("language")
+    lazy_highlight = _shared("lazy_highlight")
+    recolor_pending = _shared("recolor_pending")
+    _recolor_at = _shared("recolor_at")
+
+    def __init__(self, parent=None, buffer=None):
+        """A new editor with its own document, or another view of `buffer`."""
         super().__init__(parent)
-        self.file_path = None
+        if buffer is None: buffer = Buffer(self.document())
+        else: self.setDocument(buffer.document)
+        self.buffer = buffer
+        buffer.add_view(self)
         self._line_number_area = LineNumberArea(self)
         font = QFont("Fira Code, Consolas, Monospace"); font.setStyleHint(QFont.Monospace); font.setPointSize(11)
         self.setFont(font)
         self.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.setTabStopDistance(4 * self.fontMetrics().horizontalAdvance(' '))
-        self.highlighter = PythonHighlighter(self.document())
+        if CodeEditor.theme: self.apply_theme(CodeEditor.theme)
         self.blockCountChanged.connect(self.update_line_number_area_width)
         self.updateRequest.connect(self.update_line_number_area)
         self.cursorPositionChanged.connect(self._emit_status)
@@ -37,8 +62,55 @@ class CodeEditor(QPlainTextEdit):
         if dy: self._line_number_area.scroll(0, dy)
         else: self._line_number_area.update(0, rect.y(), self._line_number_area.width(), rect.height())
         if rect.contains(self.viewport().rect()): self.update_line_number_area_width(0)
+    def set_language(self, path, force=False):
+        """Attach the highlighter registered for `path`'s suffix (none for unknown types)."""
+        name = grammar_for(path)
+        if name == self.language and not force: return
+        hl = create_highlighter(name)
+        if hl is not None and CodeEditor.theme: hl.set_colors(**self._theme_colors(CodeEditor.theme))
+        old, self.highlighter, self.language = self.highlighter, hl, name if hl is not None else None
+        if self.lazy_highlight is not None:
+            # an empty highlighter still walks once to clear the old formats
+            self.lazy_highlight.set_highlighter(hl or BlockHighlighter())
+            return
+        if old is not None: old.setDocument(None)
+        if hl is not None: hl.setDocument(self.document())
+
+    def _prepare_highlight(self, size):
+        if self.lazy_highlight is None and self.highlighter is not None and size > self.LARGE_DOC_CHARS:
+            # detach before loading so Qt does not highlight the whole text up front
+            self.lazy_highlight = ViewportHighlighter(self, self.highlighter, parent=self.buffer)
+
+    def setPlainText(self, text: str):
+        self._prepare_highlight(len(text))
+        super().setPlainText(text)
+
+    def load_text(self, text: str, done=None):
+        """Fill a freshly opened editor; long texts go in by chunks across event-loop turns."""
+        self._prepare_highlight(len(text))
+        if len(text) <= ChunkedInsert.CHUNK_CHARS:
+            super().setPlainText(text); self.document().setModified(False)
+            if done: done()
+            return
+        self._loader = ChunkedInsert(self, text)
+        self._loader.finished.connect(self._on_loaded)
+        if done: self._loader.finished.connect(done)
+        self._loader.start()
+
+    def _on_loaded(self):
+        self._loader = None
+
+    def is_loading(self):
+        """True while load_text is still inserting chunks: the document holds only part of the file."""
+        return getattr(self, "_loader", None) is not None
+
+    def rehighlight(self):
+        if self.lazy_highlight is not None: self.lazy_highlight.rehighlight()
+        elif self.highlighter is not None: self.highlighter.rehighlight()
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        if self.lazy_highlight is not None: self.lazy_highlight.schedule_view()
         cr = self.contentsRect()
         self._line_number_area.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
     def line_number_area_paint_event(self, event):
@@ -61,7 +133,39 @@ class CodeEditor(QPlainTextEdit):
     def current_line(self): return self.textCursor().blockNumber() + 1
     def current_column(self): return self.textCursor().positionInBlock() + 1
 
-    def apply_theme(self, theme: dict):
+    @staticmethod
+    def _theme_colors(theme: dict):
+        return dict(keyword=theme.get("kw"), string=theme.get("str"), comment=theme.get("com"),
+                    classdef=theme.get("class"), funcdef=theme.get("func"), number=theme.get("num"))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.recolor_pending: self.recolor()
+
+    def recolor(self, budget=None):
+        """Re-apply highlighting after a theme change; returns True once done.
+
+        With `budget` (seconds) a small document is redone a slice of blocks per call; a color
+        change never changes block states, so rehighlightBlock does not cascade.
+        Large documents always re-color viewport-first through their ViewportHighlighter.
+        """
+        if self.highlighter is None:
+            self.recolor_pending = False; return True
+        if budget is None or self.lazy_highlight is not None:
+            self.recolor_pending = False; self._recolor_at = 0
+            self.rehighlight(); return True
+        t0 = time.perf_counter(); hl = self.highlighter
+        block = self.document().findBlockByNumber(self._recolor_at)
+        while block.isValid():
+            hl.rehighlightBlock(block); block = block.next()
+            if time.perf_counter() - t0 > budget: break
+        if block.isValid():
+            self._recolor_at = block.blockNumber(); return False
+        self.recolor_pending = False; self._recolor_at = 0
+        return True
+
+    def apply_theme(self, theme: dict, defer=False):
+        """Palette and formats switch at once; with `defer` a hidden editor re-colors when shown."""
         pal = self.palette()
         pal.setColor(QPalette.Base, QColor(theme.get("background", "#1e1e1e")))
         pal.setColor(QPalette.Text, QColor(theme.get("foreground", "#eeeeee")))
@@ -69,11 +173,11 @@ class CodeEditor(QPlainTextEdit):
         pal.setColor(QPalette.HighlightedText, QColor(theme.get("selection_text", "#000000")))
         pal.setColor(QPalette.AlternateBase, QColor(theme.get("alternateBase", theme.get("background", "#222"))))
         self.setPalette(pal)
-        self.highlighter.set_colors(
-            keyword=theme.get("kw"), string=theme.get("str"), comment=theme.get("com"),
-            classdef=theme.get("class"), funcdef=theme.get("func"), number=theme.get("num"),
-        )
-        self.highlighter.rehighlight()
+        if self.highlighter is None: return
+        changed = self.highlighter.set_colors(**self._theme_colors(theme))
+        if not changed or self.document().isEmpty(): return
+        self.recolor_pending = True; self._recolor_at = 0
+        if not defer or self.isVisible(): self.recolor()
 
     def find_next(self, text: str):
         if not text: return False
@@ -0,0 +1,106 @@
+
+import re, sys, importlib.util, importlib.metadata
+from PyQt5.QtCore import QObject, QProcess, pyqtSignal
+
+# requirement (pip) name -> import name, and import names people list -> pip name
+IMPORT_NAMES = {"Markdown": "markdown", "Pillow": "PIL", "PyYAML": "yaml", "PyMuPDF": "fitz"}
+PIP_NAMES = {"yaml": "PyYAML", "fitz": "PyMuPDF", "PIL": "Pillow"}
+
+
+def _installed(req: str) -> bool:
+    name = re.split(r"[\s<>=!~;\[]", req.strip(), maxsplit=1)[0]
+    try:
+        if importlib.util.find_spec(IMPORT_NAMES.get(name, name)) is not None: return True
+    except (ImportError, ValueError):
+        pass
+    try: importlib.metadata.distribution(PIP_NAMES.get(name, name)); return True
+    except importlib.metadata.PackageNotFoundError: return False
+
+
+def missing_requirements(requires) -> list:
+    """The requirements that are not installed, found without importing anything."""
+    return [r for r in requires or [] if not _installed(r)]
+
+
+class RequirementInstaller(QObject):
+    """Installs extensions' missing requirements with pip in a background process, one extension at a time."""
+    ARGS = ["-m", "pip", "install", "--disable-pip-version-check", "--progress-bar", "off"]
+    started = pyqtSignal(str)           # extension
+    progress = pyqtSignal(str, str)     # extension, latest output line
+    finished = pyqtSignal(str, bool)    # extension, ok
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = []      # (extension, requirements)
+        self._then = {}       # extension -> callback(ok)
+        self._proc = None
+        self.current = None
+        self.status = {}      # extension -> last output line, or why it failed
+
+    def install(self, ext, requires, then=None):
+        """Queue `requires` for `ext`; `then(ok)` runs when pip is done. Re-queuing only replaces `then`."""
+        if then: self._then[ext] = then
+        if not self.pending(ext):
+            self._queue.append((ext, [PIP_NAMES.get(r, r) for r in requires]))
+            self.status[ext] = "queued"
+        if self._proc is None: self._next()
+
+    def cancel(self, ext):
+        """Forget `ext`: drop it from the queue and drop its callback. A pip run already under way is
+        left to finish, because killing it could leave a half-installed package."""
+        self._then.pop(ext, None)
+        if any(e == ext for e, _ in self._queue):
+            self._queue = [(e, r) for e, r in self._queue if e != ext]; self.status.pop(ext, None)
+
+    def state(self, ext):
+        """What the installer is doing (or last did) for `ext`, or None."""
+        return self.status.get(ext)
+
+    def pending(self, ext):
+        return ext == self.current or any(e == ext for e, _ in self._queue)
+
+    def busy(self):
+        return self._proc is not None
+
+    def _next(self):
+        if not self._queue: return
+        self.current, reqs = self._queue.pop(0)
+        self.status[self.current] = f"installing {', '.join(reqs)}"
+        p = self._proc = QProcess(self)
+        p.setProcessChannelMode(QProcess.MergedChannels)
+        p.readyReadStandardOutput.connect(self._read)
+        p.finished.connect(lambda code, st: self._done(code == 0 and st == QProcess.NormalExit))
+        p.errorOccurred.connect(lambda err: err == QProcess.FailedToStart and self._done(False))
+        print(f"[EXT] Installing requirements for {self.current}: {reqs}")
+        p.start(sys.executable, self.ARGS + reqs)
+        self.started.emit(self.current)
+
+    def _read(self):
+        out = bytes(self._proc.readAllStandardOutput()).decode("utf-8", "replace")
+        lines = [l.strip() for l in out.splitlines() if l.strip()]
+        if lines:
+            self.status[self.current] = lines[-1]
+            for l in lines: self.progress.emit(self.current, l)
+
+    def _done(self, ok):
+        if self._proc is None: return
+        ext, p = self.current, self._proc
+        self._proc = None; self.current = None
+        p.deleteLater()
+        if ok:
+            importlib.invalidate_caches(); self.status.pop(ext, None)
+        else:
+            self.status[ext] = f"install failed: {self.status.get(ext, '')}"
+        self.finished.emit(ext, ok)
+        then = self._then.pop(ext, None)
+        if then: then(ok)
+        self._next()
+
+    def shutdown(self):
+        """Stop a running install (the app is exiting) and forget the queue."""
+        self._queue.clear(); self._then.clear()
+        p = self._proc
+        if p is None: return
+        self._proc = None
+        p.terminate()
+        if not p.waitForFinished(3000): p.kill(); p.waitForFinished(1000)
@@ -2,23 +2,34 @@
 from pathlib import Path
 
 class EditorAPI:
-    def __init__(self, main_window):
+    """What extensions may do with the editor. Each extension gets its own instance, so what it
+    registers can be taken back when that extension alone is unloaded."""
+    def __init__(self, main_window, owner=None):
         self._mw = main_window
+        self._owner = owner or True    # True: registrations not tied to a known extension
+
+    def _measured(self, kind, fn):
+        # calls into the extension count towards its figures in the Extension Manager
+        return fn if self._owner is True else self._mw.plugin_manager.stats.wrap(self._owner, kind, fn)
 
     def register_menu(self, path: str, callback):
-        self._mw.register_menu(path, callback, plugin=True)
+        self._mw.register_menu(path, self._measured("command", callback), plugin=self._owner)
 
     def register_command(self, name: str, callback, shortcut: str = None):
-        self._mw.register_command(name, callback, shortcut, plugin=True)
+        self._mw.register_command(name, self._measured("command", callback), shortcut, plugin=self._owner)
 
     def register_theme(self, name: str, theme_dict: dict):
-        self._mw.register_theme(name, theme_dict, source="plugin")
+        self._mw.register_theme(name, theme_dict, source="plugin", plugin=self._owner)
 
     def set_theme(self, theme_dict: dict, name: str = None):
         if name:
-            self._mw.register_theme(name, theme_dict, source="plugin")
+            self._mw.register_theme(name, theme_dict, source="plugin", plugin=self._owner)
             self._mw.apply_theme(name)
 
+    def register_grammar(self, grammar: dict):
+        """Declarative highlighting for file suffixes, see core.grammars.Grammar; returns its name."""
+        return self._mw.register_grammar(grammar, plugin=self._owner)
+
     def add_tab(self, widget, title: str, pane: str = "active"):
         self._mw.add_tab(widget, title, pane)
 
@@ -33,13 +44,35 @@ class EditorAPI:
         return str(self._mw.workspace_dir)
 
     def register_file_handler(self, suffixes, name: str, factory):
-        self._mw.register_file_handler(suffixes, name, factory, plugin=True)
+        self._mw.register_file_handler(suffixes, name, self._measured("open", factory), plugin=self._owner)
 
     def register_dock(self, title: str, widget, area: str = "left"):
-        self._mw.register_dock(title, widget, area, plugin=True)
+        self._mw.register_dock(title, widget, area, plugin=self._owner)
 
     def add_status_widget(self, widget):
-        self._mw.add_status_widget(widget, plugin=True)
+        self._mw.add_status_widget(widget, plugin=self._owner)
 
     def show_message(self, text: str, ms: int = 3000):
         self._mw.status.showMessage(text, ms)
+
+    def run_in_thread(self, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread and return its core.tasks.Task.
+
+        on_done(result), on_error(traceback text) and on_progress(value) are called on the GUI thread.
+        If fn takes a `task` argument it gets a TaskControl: task.progress(value), task.cancelled.
+        Tasks still running when the extension is unloaded are cancelled.
+        """
+        return self._task(self._mw.tasks.run_in_thread, fn, args, kwargs, on_done, on_error, on_progress)
+
+    def run_in_process(self, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """Like run_in_thread, in a worker process: for CPU-bound work. fn must be a top-level function
+        (of main.py or an importable module) and the arguments and result picklable."""
+        return self._task(self._mw.tasks.run_in_process, fn, args, kwargs, on_done, on_error, on_progress)
+
+    def _task(self, run, fn, args, kwargs, on_done, on_error, on_progress):
+        owner = None if self._owner is True else self._owner
+        task = run(fn, *args, owner=owner, **kwargs)
+        if on_progress: task.progress.connect(on_progress)
+        if on_done: task.finished.connect(on_done)
+        task.failed.connect(on_error or (lambda err, name=getattr(fn, "__name__", "task"): print(f"[TASK] {name} failed:\n{err}")))
+        return task
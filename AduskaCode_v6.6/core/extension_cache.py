@@ -0,0 +1,109 @@
+
+import os, io, json, shutil, hashlib, tempfile, zipfile
+from pathlib import Path
+from core.fileio import atomic_write_text
+
+
+def is_theme_only(manifest: dict) -> bool:
+    """A `"type": "theme"` manifest with its colors is registered without running the extension's code."""
+    return (manifest.get("type") == "theme" and isinstance(manifest.get("theme"), dict)
+            and not manifest.get("activationEvents"))
+
+
+class ExtensionCache:
+    """Unpacked .extend archives and parsed manifests, kept across sessions.
+
+    Each archive is extracted once into <root>/<stem>-<content hash>/ and reused while the
+    hash is the same. The index remembers every archive's (and manifest.json's) mtime and
+    size with its parsed manifest, so an unchanged extension is neither read nor hashed.
+    """
+    INDEX = "index.json"
+    THEMES = "<themes>"   # index key of the merged theme-only extensions
+
+    def __init__(self, root):
+        self.root = Path(root)
+        try: self._index = json.loads((self.root / self.INDEX).read_text(encoding="utf-8"))
+        except (OSError, ValueError): self._index = {}
+        self._dirty = False
+
+    def _cached(self, path: Path, st):
+        e = self._index.get(str(path))
+        if e and (e.get("mtime_ns"), e.get("size")) == (st.st_mtime_ns, st.st_size): return e
+        return None
+
+    def manifest(self, path: Path) -> dict:
+        """Parsed manifest.json of a folder extension; ValueError if it does not parse."""
+        st = path.stat()
+        e = self._cached(path, st)
+        if e is None:
+            e = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "manifest": json.loads(path.read_text(encoding="utf-8"))}
+            self._index[str(path)] = e; self._dirty = True
+        return e["manifest"]
+
+    def archive(self, path: Path) -> dict:
+        """Index entry of an .extend archive: its manifest, content hash and entry file name.
+
+        ValueError if the archive lacks manifest.json or main.py, zipfile.BadZipFile if it is no zip.
+        """
+        st = path.stat()
+        e = self._cached(path, st)
+        if e is not None: return e
+        data = path.read_bytes()
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            names = z.namelist()
+            manifest_name = next((n for n in names if n.endswith("manifest.json")), None)
+            entry_name = next((n for n in names if n.endswith("main.py")), None)
+            if not manifest_name or not entry_name: raise ValueError("missing manifest.json or main.py")
+            manifest = json.loads(z.read(manifest_name).decode("utf-8"))
+        e = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "manifest": manifest, "entry": entry_name,
+             "dir": f"{path.stem}-{hashlib.sha256(data).hexdigest()[:16]}"}
+        self._index[str(path)] = e; self._dirty = True
+        return e
+
+    def themes(self, children) -> dict:
+        """Theme-only extensions among `children` as {file name: [theme name, colors]}.
+
+        Cached as one entry for the whole extension set, rebuilt when any extension changes.
+        """
+        sig = []
+        for c in children:
+            try: st = (c / "manifest.json").stat() if c.is_dir() else c.stat(); sig.append([c.name, st.st_mtime_ns, st.st_size])
+            except OSError: sig.append([c.name])
+        e = self._index.get(self.THEMES)
+        if e and e.get("sig") == sig: return e["themes"]
+        out = {}
+        for c in children:
+            try: m = self.manifest(c / "manifest.json") if c.is_dir() else self.archive(c)["manifest"]
+            except Exception: continue
+            if is_theme_only(m): out[c.name] = [m.get("name", c.stem), m["theme"]]
+        self._index[self.THEMES] = {"sig": sig, "themes": out}; self._dirty = True
+        return out
+
+    def unpack(self, path: Path, entry: dict) -> Path:
+        """The archive's main.py in its extracted copy, extracting it first if needed."""
+        d = self.root / entry["dir"]
+        main = d / entry["entry"]
+        if main.exists(): return main
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".unpack-", dir=str(self.root))
+        try:
+            with zipfile.ZipFile(path) as z: z.extractall(tmp)
+            os.replace(tmp, d)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)   # another instance unpacked it first
+            if not main.exists(): raise
+        return main
+
+    def save(self):
+        """Write the index if it changed and drop copies of archives that are gone or changed."""
+        if not self._dirty: return
+        self._index = {k: e for k, e in self._index.items() if k == self.THEMES or os.path.exists(k)}
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.root / self.INDEX, json.dumps(self._index))
+            keep = {e["dir"] for e in self._index.values() if "dir" in e}
+            for d in self.root.iterdir():
+                if d.is_dir() and d.name not in keep and not d.name.startswith("."): shutil.rmtree(d, ignore_errors=True)
+        except OSError as e:
+            print("[EXT] cache error:", e)
+        self._dirty = False
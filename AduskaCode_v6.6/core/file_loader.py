@@ -0,0 +1,160 @@
+
+import os, codecs, locale, time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QProgressBar, QPushButton
+from core.search_filter import looks_binary
+
+READ_CHUNK = 1024 * 1024
+BOMS = [(codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"), (codecs.BOM_UTF8, "utf-8-sig"),
+        (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]
+
+_pool = None
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="aduska-load")
+    return _pool
+
+
+def fallback_encodings():
+    # the locale's encoding (cp1250 on a Central European system) first, then the common
+    # Windows-1252; cp1250 only gets the bytes 1252 leaves undefined
+    pref = codecs.lookup(locale.getpreferredencoding(False)).name
+    return [e for e in dict.fromkeys((pref, "cp1252", "cp1250")) if e not in ("utf-8", "ascii")]
+
+
+def decode(raw: bytes, force=False):
+    """(text, encoding) for `raw`, or None if it looks binary and `force` is not set.
+
+    A BOM wins; otherwise strict UTF-8, then the locale and common single-byte encodings,
+    and latin-1 last (it never fails and round-trips every byte on save).
+    """
+    for bom, enc in BOMS:
+        if raw.startswith(bom): return raw.decode(enc, errors="replace"), enc
+    if not force and looks_binary(raw): return None
+    for enc in ["utf-8"] + fallback_encodings():
+        try: return raw.decode(enc), enc
+        except (UnicodeDecodeError, LookupError): pass
+    return raw.decode("latin-1"), "latin-1"
+
+
+class LoadJob(QObject):
+    """Reads and decodes one file on the loader pool."""
+    progress = pyqtSignal(int, int)    # bytes read, total
+    loaded = pyqtSignal(object, str)   # text (object: no QString round trip), encoding
+    binary = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, force_text=False):
+        super().__init__()
+        self.path = str(path)
+        self.force_text = force_text
+
+    def start(self):
+        _executor().submit(self._run)
+
+    def _emit(self, sig, *args):
+        try: sig.emit(*args)
+        except RuntimeError: pass   # the tab was closed meanwhile
+
+    def _run(self):
+        try:
+            with open(self.path, "rb") as f:
+                total = os.fstat(f.fileno()).st_size
+                buf = bytearray()
+                while True:
+                    chunk = f.read(READ_CHUNK)
+                    if not chunk: break
+                    buf += chunk
+                    if total > READ_CHUNK: self._emit(self.progress, len(buf), total)
+            res = decode(bytes(buf), self.force_text)
+        except Exception as e:
+            self._emit(self.failed, str(e)); return
+        if res is None:
+            self._emit(self.binary); return
+        text, enc = res
+        if "\r" in text: text = text.replace("\r\n", "\n").replace("\r", "\n")
+        self._emit(self.loaded, text, enc)
+
+
+class LoadingTab(QWidget):
+    """Placeholder tab shown while a file is read; the main window swaps in the editor."""
+    loaded = pyqtSignal(object, str)   # text (object: no QString round trip), encoding
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.file_path = path
+        lay = QVBoxLayout(self); lay.setAlignment(Qt.AlignCenter)
+        self.label = QLabel(f"Opening {path.name}…"); self.label.setAlignment(Qt.AlignCenter)
+        self.bar = QProgressBar(); self.bar.setRange(0, 0); self.bar.setFixedWidth(320)
+        self.btn_force = QPushButton("Open as text anyway"); self.btn_force.hide()
+        self.btn_force.clicked.connect(lambda: self.start(force_text=True))
+        lay.addWidget(self.label); lay.addWidget(self.bar, 0, Qt.AlignCenter); lay.addWidget(self.btn_force, 0, Qt.AlignCenter)
+        self.job = None
+
+    def start(self, force_text=False):
+        self.btn_force.hide(); self.bar.show(); self.bar.setRange(0, 0)
+        self.label.setText(f"Opening {self.file_path.name}…")
+        self.job = LoadJob(self.file_path, force_text)
+        self.job.progress.connect(self._on_progress)
+        self.job.loaded.connect(self.loaded)
+        self.job.binary.connect(self._on_binary)
+        self.job.failed.connect(self._on_failed)
+        self.job.start()
+
+    def _on_progress(self, done, total):
+        self.bar.setRange(0, 1000); self.bar.setValue(int(done * 1000 / max(1, total)))
+
+    def _on_binary(self):
+        self.bar.hide(); self.btn_force.show()
+        self.label.setText(f"{self.file_path.name} looks like a binary file.")
+
+    def _on_failed(self, err):
+        self.bar.hide(); self.label.setText(f"Could not open {self.file_path}:\n{err}")
+
+
+class ChunkedInsert(QObject):
+    """Appends a long text to a document in pieces across event-loop turns."""
+    finished = pyqtSignal()
+
+    CHUNK_CHARS = 256 * 1024
+    BUDGET_SEC = 0.015
+
+    def __init__(self, editor, text: str):
+        super().__init__(editor)
+        self.editor = editor
+        self.text = text
+        self.pos = 0
+        self._timer = QTimer(self); self._timer.setInterval(0); self._timer.timeout.connect(self._step)
+
+    def start(self):
+        doc = self.editor.document()
+        doc.setUndoRedoEnabled(False)
+        self.editor.setReadOnly(True)
+        self._step()
+        if self.pos < len(self.text): self._timer.start()
+
+    def _step(self):
+        t0 = time.perf_counter(); text = self.text
+        cur = QTextCursor(self.editor.document())
+        while self.pos < len(text):
+            end = self.pos + self.CHUNK_CHARS
+            if end < len(text):
+                nl = text.rfind("\n", self.pos, end)   # whole lines per piece
+                if nl > self.pos: end = nl + 1
+            cur.movePosition(QTextCursor.End)
+            cur.insertText(text[self.pos:end])
+            self.pos = end
+            self.editor.document().setModified(False)   # partial text must never look like unsaved edits
+            if time.perf_counter() - t0 > self.BUDGET_SEC: return
+        self._timer.stop()
+        doc = self.editor.document()
+        doc.setUndoRedoEnabled(True)
+        doc.setModified(False)
+        self.editor.setReadOnly(False)
+        self.text = ""
+        self.finished.emit()
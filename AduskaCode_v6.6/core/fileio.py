@@ -0,0 +1,84 @@
+
+import os, tempfile
+from pathlib import Path
+
+_UMASK = os.umask(0); os.umask(_UMASK)   # read once at import: setting it is not thread-safe
+
+
+def write_temp(path, text: str, encoding="utf-8", fsync=False) -> str:
+    """Write `text` to a temp file next to `path` and return its name."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+            if fsync:
+                f.flush(); os.fsync(f.fileno())
+    except BaseException:
+        _unlink(tmp)
+        raise
+    return tmp
+
+
+def commit_temp(tmp, path):
+    """Move a temp file from write_temp() over `path`, keeping the target's permissions
+    (a new file gets the usual 0o666 & ~umask rather than mkstemp's 0o600)."""
+    try:
+        try: mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError: mode = 0o666 & ~_UMASK
+        os.chmod(tmp, mode)
+    except OSError:
+        pass
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        _unlink(tmp)
+        raise
+
+
+def fsync_path(path, directory=False):
+    """Flush a file (or, where the platform allows it, a directory entry) to disk."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY if directory else os.O_RDWR)
+    except OSError:
+        if directory: return
+        raise
+    try: os.fsync(fd)
+    except OSError:
+        if not directory: raise
+    finally: os.close(fd)
+
+
+def _unlink(p):
+    try: os.unlink(p)
+    except OSError: pass
+
+
+def atomic_write_text(path, text: str, encoding="utf-8", fsync=False):
+    """Write via a temp file in the same directory + rename, so readers never see a half-written file."""
+    commit_temp(write_temp(path, text, encoding, fsync), path)
+
+
+def atomic_write_many(items, fsync=False) -> list:
+    """Atomically write (path, text, encoding) items; returns an error string or None per item.
+
+    With `fsync`, all temp files are written first and flushed together, then renamed,
+    and each parent directory is flushed once, instead of a sync per file.
+    """
+    errors = [None] * len(items)
+    temps = {}
+    for i, (path, text, enc) in enumerate(items):
+        try: temps[i] = write_temp(path, text, enc)
+        except Exception as e: errors[i] = str(e)
+    if fsync:
+        for i, tmp in list(temps.items()):
+            try: fsync_path(tmp)
+            except OSError as e: errors[i] = str(e); _unlink(temps.pop(i))
+    dirs = set()
+    for i, tmp in temps.items():
+        path = items[i][0]
+        try: commit_temp(tmp, path); dirs.add(os.path.dirname(os.path.abspath(path)))
+        except Exception as e: errors[i] = str(e)
+    if fsync:
+        for d in dirs: fsync_path(d, directory=True)
+    return errors
@@ -0,0 +1,155 @@
+
+import re
+from pathlib import Path
+from core.highlighter import CodeHighlighter, PythonHighlighter, JSONHighlighter, STATE_NONE, utf16_spans
+
+
+class Grammar:
+    """A declarative grammar compiled into one alternation regex.
+
+    spec = {
+        "name": "shell", "suffixes": [".sh", ".bash"],
+        "case_sensitive": True,                                   # optional
+        "rules": [                                                # tried left to right
+            {"role": "comment", "match": r"#.*"},
+            {"role": "keyword", "words": ["if", "then", "fi"]},
+        ],
+        "regions": [                                              # may span lines
+            {"role": "comment", "begin": r"/\\*", "end": r"\\*/"},
+        ],
+    }
+    Roles are those of CodeHighlighter: keyword, string, comment, number, class, def.
+    """
+    def __init__(self, spec: dict):
+        self.name = str(spec["name"])
+        self.suffixes = [s.lower() if s.startswith(".") else "." + s.lower() for s in spec.get("suffixes", ())]
+        flags = 0 if spec.get("case_sensitive", True) else re.IGNORECASE
+        parts = []
+        self.kinds = {}     # group name -> (role, end regex or None, state)
+        for i, r in enumerate(spec.get("regions", ())):
+            role = self._role(r)
+            begin = self._check(r["begin"], flags)
+            if begin.match(""): raise ValueError(f"grammar {self.name}: region begin {r['begin']!r} matches empty text")
+            self.kinds[f"r{i}"] = (role, self._check(r["end"], flags), i + 1)
+            parts.append(f"(?P<r{i}>{r['begin']})")
+        for i, r in enumerate(spec.get("rules", ())):
+            role = self._role(r)
+            if "words" in r:
+                pat = r"\b(?:%s)\b" % "|".join(map(re.escape, sorted(r["words"], key=len, reverse=True)))
+            else:
+                pat = r["match"]
+            self._check(pat, flags)
+            self.kinds[f"t{i}"] = (role, None, STATE_NONE)
+            parts.append(f"(?P<t{i}>{pat})")
+        self.regex = re.compile("|".join(parts) or r"(?!)", flags)
+        self.ends = {state: (role, end) for role, end, state in self.kinds.values() if end is not None}
+
+    def _role(self, rule):
+        role = rule.get("role")
+        if role not in CodeHighlighter.ROLES:
+            raise ValueError(f"grammar {self.name}: unknown role {role!r} (one of {', '.join(CodeHighlighter.ROLES)})")
+        return role
+
+    def _check(self, pat, flags):
+        try: return re.compile(pat, flags)
+        except re.error as e: raise ValueError(f"grammar {self.name}: bad pattern {pat!r}: {e}") from None
+
+
+class GrammarHighlighter(CodeHighlighter):
+    def __init__(self, grammar: Grammar, document=None):
+        self.grammar = grammar
+        super().__init__(document)
+
+    def spans(self, text: str, state: int):
+        g, f = self.grammar, self.formats
+        out = []; add = out.append
+        pos = 0
+        if state in g.ends:
+            role, end = g.ends[state]
+            m = end.search(text)
+            if m is None: return ([(0, len(text), f[role])] if text else []), state
+            pos = m.end(); add((0, pos, f[role]))
+        state = STATE_NONE
+        while state == STATE_NONE:
+            for m in g.regex.finditer(text, pos):
+                role, end, region = g.kinds[m.lastgroup]
+                start = m.start()
+                if end is None:
+                    if m.end() > start: add((start, m.end() - start, f[role]))
+                    continue
+                e = end.search(text, m.end())
+                if e is None:
+                    add((start, len(text) - start, f[role])); state = region
+                else:
+                    pos = e.end(); add((start, pos - start, f[role]))
+                break   # resume after the region
+            else:
+                break
+        return utf16_spans(text, out), state
+
+
+BUILTIN_GRAMMARS = [
+    {"name": "shell", "suffixes": [".sh", ".bash", ".zsh"], "rules": [
+        {"role": "comment", "match": r"(?<![\w$])#.*"},
+        {"role": "string", "match": r"\"(?:[^\"\\]|\\.)*\"?|'[^']*'?"},
+        {"role": "keyword", "words": "if then else elif fi for while until do done case esac in function "
+                                     "return local export readonly select time".split()},
+        {"role": "def", "match": r"\$\{[^}]*\}|\$\w+|\$[@*#?$!0-9-]"},
+        {"role": "number", "match": r"\b\d+\b"},
+    ]},
+    {"name": "c", "suffixes": [".c", ".h", ".cpp", ".hpp", ".cc", ".cxx", ".hh"], "rules": [
+        {"role": "comment", "match": r"//.*"},
+        {"role": "string", "match": r"\"(?:[^\"\\]|\\.)*\"?|'(?:[^'\\]|\\.)*'?"},
+        {"role": "class", "match": r"^\s*#\s*\w+"},
+        {"role": "keyword", "words": "auto break case char const continue default do double else enum extern float for "
+                                     "goto if inline int long register return short signed sizeof static struct switch "
+                                     "typedef union unsigned void volatile while bool true false nullptr class namespace "
+                                     "template typename public private protected virtual override new delete this using".split()},
+        {"role": "number", "match": r"\b(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)[uUlLfF]*\b"},
+    ], "regions": [{"role": "comment", "begin": r"/\*", "end": r"\*/"}]},
+]
+
+_SPECS = {}       # name -> compiled Grammar, or a BlockHighlighter subclass for hand-written ones
+_SUFFIXES = {}    # ".ext" -> name; the last registration wins
+
+
+def register_grammar(spec) -> str:
+    """Compile and register a declarative grammar dict; raises ValueError if it is malformed."""
+    g = Grammar(spec)
+    _SPECS[g.name] = g
+    for s in g.suffixes: _SUFFIXES[s] = g.name
+    return g.name
+
+
+def register_highlighter(name: str, suffixes, cls):
+    _SPECS[name] = cls
+    for s in suffixes: _SUFFIXES[s.lower()] = name
+
+
+def unregister_grammar(name: str):
+    _SPECS.pop(name, None)
+    for s in [s for s, n in _SUFFIXES.items() if n == name]: del _SUFFIXES[s]
+
+
+def grammar_for(path):
+    """Name of the grammar registered for `path`'s suffix, or None."""
+    return _SUFFIXES.get(Path(str(path)).suffix.lower()) if path else None
+
+
+def create_highlighter(name):
+    """A detached highlighter for grammar `name` (None for unknown names)."""
+    spec = _SPECS.get(name)
+    if spec is None: return None
+    if isinstance(spec, Grammar): return GrammarHighlighter(spec)
+    return spec()
+
+
+def reset_grammars():
+    """Drop plugin grammars, back to the built-in ones."""
+    _SPECS.clear(); _SUFFIXES.clear()
+    register_highlighter("python", [".py", ".pyw", ".pyi"], PythonHighlighter)
+    register_highlighter("json", [".json"], JSONHighlighter)
+    for spec in BUILTIN_GRAMMARS: register_grammar(spec)
+
+
+reset_grammars()
@@ -0,0 +1,211 @@
+
+import os, json, time, uuid, zlib
+from pathlib import Path
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from core.code_editor import CodeEditor
+from core.file_loader import LoadingTab, decode
+from core.recovery import swap_writer, best_effort, replay
+
+
+def _write_snapshot(path, header):
+    data = zlib.compress((json.dumps(header) + "\n").encode("utf-8"), 1)
+    with open(path, "wb") as f: f.write(data)
+
+
+def _snapshot_text(path):
+    _, enc, text = replay(path)
+    return text, enc
+
+
+def _discard(path):
+    try: swap_writer().submit(best_effort, os.unlink, path)
+    except RuntimeError: pass   # shutting down; the session's swap directory goes anyway
+
+
+class HibernatedTab(LoadingTab):
+    """Stands in for an evicted editor; loads it back (from disk, or from its snapshot if it
+    had unsaved changes) when the tab is activated.
+
+    The snapshot is a compressed swap file in the recovery directory, so a crash while the
+    tab sleeps still offers the changes for recovery.
+    """
+    restore_failed = pyqtSignal(str)
+
+    def __init__(self, path, state: dict, snapshot=None, parent=None):
+        super().__init__(path, parent)
+        self.state = state         # cursor, anchor, vscroll, hscroll, modified
+        self.snapshot = snapshot
+        self.waiters = []
+        self.started = False
+        self.restore_failed.connect(self._on_failed)
+        self.destroyed.connect(lambda *_, s=snapshot: s and _discard(s))
+
+    @property
+    def modified(self):
+        return self.state.get("modified", False)
+
+    def is_modified(self):
+        return self.modified
+
+    def start(self, force_text=False):
+        self.started = True
+        if self.snapshot is None: return super().start(force_text)
+        self.btn_force.hide(); self.bar.show(); self.bar.setRange(0, 0)
+        self.label.setText(f"Restoring {self.file_path.name}…")
+        # queued behind the snapshot's own write on the swap writer
+        swap_writer().submit(self._replay)
+
+    def _replay(self):
+        try: _, enc, text = replay(self.snapshot)
+        except Exception as e: return self._emit(self.restore_failed, str(e))
+        self._emit(self.loaded, text, enc)
+
+    def _emit(self, sig, *args):
+        try: sig.emit(*args)
+        except RuntimeError: pass   # the tab was closed meanwhile
+
+    def text(self) -> str:
+        """The document as it was put to sleep."""
+        if self.snapshot is None:
+            with open(self.file_path, "rb") as f: return decode(f.read(), force=True)[0]
+        swap_writer().submit(lambda: None).result()
+        return replay(self.snapshot)[2]
+
+    def save_via(self, saver):
+        """Queue writing the snapshot to the file on `saver` (the SaveService) without waking the editor."""
+        if not self.modified or saver.is_busy(self): return
+        saver.save_from(self, self.file_path, lambda s=self.snapshot: _snapshot_text(s))
+
+    def mark_saved(self):
+        self.state["modified"] = False
+        if self.snapshot: _discard(self.snapshot); self.snapshot = None
+
+
+class Hibernator(QObject):
+    """Evicts editors of inactive tabs, least recently used first.
+
+    An editor sleeps once it has not been active for IDLE_SEC, or earlier while the estimated
+    size of all open documents is over `budget` bytes. Clean documents are simply dropped
+    and read again from disk; modified ones are snapshotted first. Documents shown in several
+    views, untitled ones and those still loading stay awake.
+    """
+    CHECK_MS = 30 * 1000
+    IDLE_SEC = 10 * 60
+    BLOCK_BYTES = 240          # per line: QTextBlock, its layout and highlight formats
+    VIEW_BYTES = 256 * 1024    # per editor widget (viewport, fonts, undo stack baseline)
+    _written = pyqtSignal(object, object, str)   # editor, snapshot, error (swap writer -> GUI thread)
+
+    def __init__(self, main, budget_mb=256):
+        super().__init__(main)
+        self.main = main
+        self.budget = budget_mb * 1024 * 1024
+        self._used = {}     # widget -> last time it was current
+        self._writing = {}  # modified editor -> document revision its snapshot is being written at
+        self._written.connect(self._on_written)
+        self._timer = QTimer(self); self._timer.timeout.connect(self.check); self._timer.start(self.CHECK_MS)
+        for tabs in (main.left_tabs, main.right_tabs):
+            tabs.currentChanged.connect(lambda i, tabs=tabs: self._activated(tabs.widget(i)))
+
+    @classmethod
+    def cost(cls, editor):
+        doc = editor.document()
+        return cls.VIEW_BYTES + doc.characterCount() * 2 + doc.blockCount() * cls.BLOCK_BYTES
+
+    def activate(self, w):
+        """Note that `w` became the current tab, waking it if it sleeps."""
+        self._activated(w)
+
+    def _activated(self, w):
+        if w is None: return
+        self._used[w] = time.monotonic()
+        if isinstance(w, HibernatedTab) and not w.started: w.start()
+        if self.budget: QTimer.singleShot(0, self.check)
+
+    def _eligible(self, w, current):
+        return (isinstance(w, CodeEditor) and w not in current and w.file_path is not None
+                and len(w.buffer.views) == 1 and not w.isReadOnly() and w not in self._writing)
+
+    def check(self):
+        m = self.main
+        current = {t.currentWidget() for t in (m.left_tabs, m.right_tabs)}
+        present = [t.widget(i) for t in (m.left_tabs, m.right_tabs) for i in range(t.count())]
+        editors = [w for w in present if isinstance(w, CodeEditor)]
+        now = time.monotonic()
+        for w in editors: self._used.setdefault(w, now)
+        total = sum(self.cost(w) for w in editors)
+        for w in sorted((w for w in editors if self._eligible(w, current)), key=self._used.get):
+            if not (self.budget and total > self.budget) and now - self._used[w] < self.IDLE_SEC: break
+            total -= self.cost(w)
+            self.hibernate(w)
+        present = set(present)
+        for w in [w for w in self._used if w not in present]: del self._used[w]
+
+    def hibernate(self, ed):
+        """Put `ed` to sleep. A modified editor stays live until its snapshot is on disk, and for
+        good if the snapshot cannot be written."""
+        if ed in self._writing: return
+        doc = ed.document()
+        if not doc.isModified(): return self._swap(ed, None)
+        snapshot = str(self.main.recovery.dir / f"{uuid.uuid4().hex}.swapz")
+        header = {"v": 1, "path": str(ed.file_path), "encoding": ed.encoding, "text": doc.toPlainText()}
+        self._writing[ed] = doc.revision()
+        fut = swap_writer().submit(_write_snapshot, snapshot, header)
+        fut.add_done_callback(lambda f, ed=ed, s=snapshot: self._emit_written(ed, s, f.exception()))
+
+    def _emit_written(self, ed, snapshot, exc):
+        try: self._written.emit(ed, snapshot, str(exc) if exc else "")
+        except RuntimeError: pass   # shutting down
+
+    def _on_written(self, ed, snapshot, err):
+        rev = self._writing.pop(ed, None)
+        if err:
+            _discard(snapshot)
+            self.main.status.showMessage(f"Could not hibernate {ed.file_path.name}: {err}", 8000)
+            return
+        current = {t.currentWidget() for t in (self.main.left_tabs, self.main.right_tabs)}
+        try: changed = ed.document().revision() != rev or not self._eligible(ed, current)
+        except RuntimeError: changed = True   # closed meanwhile
+        if changed: return _discard(snapshot)
+        self._swap(ed, snapshot)
+
+    def _swap(self, ed, snapshot):
+        m = self.main
+        tabs, i = m._tab_of(ed)
+        if tabs is None:
+            if snapshot: _discard(snapshot)
+            return None
+        h = self.placeholder(ed.file_path, self.view_state(ed), snapshot)
+        icon, tip, text = tabs.tabIcon(i), tabs.tabToolTip(i), tabs.tabText(i)
+        tabs.blockSignals(True)
+        try:
+            tabs.insertTab(i, h, icon, text); tabs.removeTab(i + 1)
+        finally:
+            tabs.blockSignals(False)
+        tabs.setTabToolTip(i, tip)
+        self._used[h] = self._used.pop(ed, time.monotonic())
+        ed.deleteLater()
+        return h
+
+    def placeholder(self, path, state: dict, snapshot=None):
+        """A sleeping tab for `path`; on first show it loads and gets `state` back."""
+        m = self.main; path = Path(path)
+        h = HibernatedTab(path, state, snapshot, m)
+        h.label.setText(f"{path.name} loads when shown."); h.bar.hide()
+        h.loaded.connect(lambda text, enc, h=h: m._finish_open(h, text, enc, modified=h.modified))
+        h.waiters.append(lambda ed, s=state: self._restore(ed, s))
+        m.note_loading(path, h)
+        return h
+
+    @staticmethod
+    def view_state(ed) -> dict:
+        cur = ed.textCursor()
+        return {"cursor": cur.position(), "anchor": cur.anchor(), "modified": ed.document().isModified(),
+                "vscroll": ed.verticalScrollBar().value(), "hscroll": ed.horizontalScrollBar().value()}
+
+    @staticmethod
+    def _restore(ed, s):
+        cur = ed.textCursor()
+        n = ed.document().characterCount() - 1
+        cur.setPosition(min(s.get("anchor", 0), n)); cur.setPosition(min(s.get("cursor", 0), n), cur.KeepAnchor)
+        ed.setTextCursor(cur)
+        ed.verticalScrollBar().setValue(s.get("vscroll", 0)); ed.horizontalScrollBar().setValue(s.get("hscroll", 0))
@@ -1,4 +1,5 @@
 
+import re
 from PyQt5.QtCore import QRegularExpression
 from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QFont, QColor
 
@@ -9,79 +10,178 @@ def fmt(color: QColor, bold=False, italic=False):
     if italic: f.setFontItalic(True)
     return f
 
-class PythonHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
+# (grammar, colors) -> {role: QTextCharFormat}; every highlighter on the same theme shares one set
+_FORMATS = {}
+
+
+def shared_formats(grammar: str, colors: dict, build):
+    key = (grammar, tuple(sorted(colors.items())))
+    formats = _FORMATS.get(key)
+    if formats is None:
+        formats = _FORMATS[key] = build(colors)
+    return formats
+
+PY_KEYWORDS = frozenset((
+    'and as assert break class continue def del elif else except False finally for from global '
+    'if import in is lambda None nonlocal not or pass raise return True try while with yield').split())
+
+# One pass per block: the alternation consumes whole tokens left to right, so a "#" inside a
+# string or a keyword inside an identifier is never looked at twice.
+PY_TOKEN_RE = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<triple>(?:[rRbBuUfF]{1,2})?(?:'{3}|"{3}))
+  | (?P<string>(?:[rRbBuUfF]{1,2})?(?:'[^'\\]*(?:\\.[^'\\]*)*'?|"[^"\\]*(?:\\.[^"\\]*)*"?))
+  | (?P<ident>[^\W\d]\w*)
+  | (?P<number>\b(?:0[xXoObB][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?)[jJ]?\b)
+""", re.VERBOSE)
+
+# block states: inside a triple-quoted string that started on an earlier line
+STATE_NONE, STATE_SQ3, STATE_DQ3 = -1, 1, 2
+_CLOSERS = {STATE_SQ3: "'''", STATE_DQ3: '"""'}
+
+
+_ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
+
+def utf16_spans(text: str, spans):
+    """Convert (start, length, fmt) spans from str indices to the UTF-16 offsets Qt expects."""
+    if text.isascii() or not _ASTRAL.search(text): return spans
+    shift = []; acc = 0
+    for ch in text:
+        shift.append(acc)
+        if ord(ch) > 0xFFFF: acc += 1
+    shift.append(acc)
+    return [(s + shift[s], n + shift[s + n] - shift[s], f) for s, n, f in spans]
+
+
+class BlockHighlighter(QSyntaxHighlighter):
+    """A highlighter whose per-block work is the pure `spans(text, state)` call.
+
+    Under QSyntaxHighlighter the spans are applied with setFormat; the same grammar can
+    also be driven without a document attached (see core/lazy_highlight.py).
+    Formats come from the process-wide cache, keyed by FORMATS and the current colors.
+    """
+    FORMATS = ""
+    DEFAULT_COLORS = {}
+
+    def __init__(self, document=None):
         super().__init__(document)
-        self.colors = {
-            "keyword": QColor("#c586c0"),
-            "string": QColor("#ce9178"),
-            "comment": QColor("#6a9955"),
-            "classdef": QColor("#4ec9b0"),
-            "funcdef": QColor("#dcdcaa"),
-            "number": QColor("#b5cea8"),
-        }
+        self.colors = dict(self.DEFAULT_COLORS)
         self._compile()
 
     def set_colors(self, **kwargs):
+        """Switch to the formats of another theme (unknown roles are ignored); True if anything changed."""
+        colors = dict(self.colors)
         for k, v in kwargs.items():
-            if v:
-                self.colors[k] = QColor(v)
+            if v and k in colors:
+                colors[k] = QColor(v).name()
+        if colors == self.colors: return False
+        self.colors = colors
         self._compile()
+        return True
+
+    @staticmethod
+    def _build(c):
+        return {}
 
     def _compile(self):
-        kw = ('and as assert break class continue def del elif else except False finally for from global '
-              'if import in is lambda None nonlocal not or pass raise return True try while with yield').split()
-        self.rules = []
-        kwf = fmt(self.colors["keyword"], bold=True)
-        for w in kw:
-            self.rules.append((QRegularExpression(rf"\b{w}\b"), kwf))
-        strf = fmt(self.colors["string"])
-        self.rules.append((QRegularExpression(r"'[^'\\n]*'"), strf))
-        self.rules.append((QRegularExpression(r"\"[^\"\\n]*\""), strf))
-        numf = fmt(self.colors["number"])
-        self.rules.append((QRegularExpression(r"\b-?\d+(\.\d+)?([eE][+-]?\d+)?\b"), numf))
-        classf = fmt(self.colors["classdef"], bold=True)
-        funcf = fmt(self.colors["funcdef"], bold=True)
-        self.rules.append((QRegularExpression(r"\bclass\s+(\w+)"), classf))
-        self.rules.append((QRegularExpression(r"\bdef\s+(\w+)"), funcf))
-        self.com_re = QRegularExpression(r"#.*")
-        self.com_fmt = fmt(self.colors["comment"], italic=True)
+        self.formats = shared_formats(self.FORMATS, self.colors, self._build)
+
+    def spans(self, text: str, state: int):
+        """Return ([(utf16_start, length, QTextCharFormat), ...], end_state) for one block."""
+        return [], STATE_NONE
 
     def highlightBlock(self, text: str):
-        for pattern, f in self.rules:
-            it = pattern.globalMatch(text)
-            while it.hasNext():
-                m = it.next()
-                self.setFormat(m.capturedStart(), m.capturedLength(), f)
-        it = self.com_re.globalMatch(text)
-        while it.hasNext():
-            m = it.next()
-            self.setFormat(m.capturedStart(), m.capturedLength(), self.com_fmt)
+        spans, state = self.spans(text, self.previousBlockState())
+        for start, n, f in spans:
+            self.setFormat(start, n, f)
+        self.setCurrentBlockState(state)
 
 
-class JSONHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.colors = {
-            "key": QColor("#9cdcfe"),
-            "string": QColor("#ce9178"),
-            "number": QColor("#b5cea8"),
-            "bool": QColor("#569cd6"),
-            "null": QColor("#569cd6"),
+class CodeHighlighter(BlockHighlighter):
+    """The six code roles themes color: keyword, string, comment, number, class and def."""
+    FORMATS = "code"
+    ROLES = ("keyword", "string", "comment", "number", "class", "def")
+    DEFAULT_COLORS = {
+        "keyword": "#c586c0", "string": "#ce9178", "comment": "#6a9955",
+        "classdef": "#4ec9b0", "funcdef": "#dcdcaa", "number": "#b5cea8",
+    }
+
+    @staticmethod
+    def _build(c):
+        return {
+            "keyword": fmt(QColor(c["keyword"]), bold=True), "string": fmt(QColor(c["string"])),
+            "comment": fmt(QColor(c["comment"]), italic=True), "number": fmt(QColor(c["number"])),
+            "class": fmt(QColor(c["classdef"]), bold=True), "def": fmt(QColor(c["funcdef"]), bold=True),
         }
-        self._compile()
+
+
+class PythonHighlighter(CodeHighlighter):
+    def spans(self, text: str, state: int):
+        f = self.formats; out = []; add = out.append
+        pos = 0
+        if state in _CLOSERS:
+            # continue a triple-quoted string opened on an earlier line
+            end = text.find(_CLOSERS[state])
+            if end < 0: return ([(0, len(text), f["string"])] if text else []), state
+            pos = end + 3; add((0, pos, f["string"]))
+        state = STATE_NONE
+        pending = None   # "class"/"def" seen, the next identifier is the name
+        while state == STATE_NONE:
+            for m in PY_TOKEN_RE.finditer(text, pos):
+                kind = m.lastgroup
+                start = m.start(); n = m.end() - start
+                if kind == "ident":
+                    word = m.group()
+                    if pending:
+                        add((start, n, f[pending])); pending = None
+                    elif word in PY_KEYWORDS:
+                        add((start, n, f["keyword"]))
+                        if word in ("class", "def"): pending = word
+                elif kind == "triple":
+                    quote = STATE_DQ3 if m.group().endswith('"') else STATE_SQ3
+                    end = text.find(_CLOSERS[quote], m.end())
+                    if end < 0:
+                        add((start, len(text) - start, f["string"])); state = quote
+                    else:
+                        pos = end + 3; add((start, pos - start, f["string"])); pending = None
+                    break   # resume tokenizing after the closing quotes
+                else:
+                    add((start, n, f[kind])); pending = None
+            else:
+                break
+        return utf16_spans(text, out), state
+
+
+# compiled once per process, shared by every JSONHighlighter
+JSON_RULES = [
+    (QRegularExpression(r'"([^"\\]|\\.)*"(?=\s*:)'), "key"),
+    (QRegularExpression(r'(?<=:)\s*"([^"\\]|\\.)*"'), "string"),
+    (QRegularExpression(r"\b-?\d+(\.\d+)?([eE][+-]?\d+)?\b"), "number"),
+    (QRegularExpression(r"\btrue\b|\bfalse\b"), "bool"),
+    (QRegularExpression(r"\bnull\b"), "null"),
+]
+
+
+class JSONHighlighter(BlockHighlighter):
+    FORMATS = "json"
+    DEFAULT_COLORS = {"key": "#9cdcfe", "string": "#ce9178", "number": "#b5cea8", "bool": "#569cd6", "null": "#569cd6"}
+
+    @staticmethod
+    def _build(c):
+        return {"key": fmt(QColor(c["key"]), bold=True), "string": fmt(QColor(c["string"])),
+                "number": fmt(QColor(c["number"])), "bool": fmt(QColor(c["bool"]), bold=True),
+                "null": fmt(QColor(c["null"]))}
 
     def _compile(self):
-        self.rules = []
-        self.rules.append((QRegularExpression(r'"([^"\\]|\\.)*"(?=\s*:)'), fmt(self.colors["key"], bold=True)))
-        self.rules.append((QRegularExpression(r'(?<=:)\s*"([^"\\]|\\.)*"'), fmt(self.colors["string"])))
-        self.rules.append((QRegularExpression(r"\b-?\d+(\.\d+)?([eE][+-]?\d+)?\b"), fmt(self.colors["number"])))
-        self.rules.append((QRegularExpression(r"\btrue\b|\bfalse\b"), fmt(self.colors["bool"], bold=True)))
-        self.rules.append((QRegularExpression(r"\bnull\b"), fmt(self.colors["null"])))
+        super()._compile()
+        self.rules = [(rx, self.formats[role]) for rx, role in JSON_RULES]
 
-    def highlightBlock(self, text: str):
+    def spans(self, text: str, state: int):
+        out = []
         for pattern, f in self.rules:
             it = pattern.globalMatch(text)
             while it.hasNext():
                 m = it.next()
-                self.setFormat(m.capturedStart(), m.capturedLength(), f)
+                out.append((m.capturedStart(), m.capturedLength(), f))
+        return out, STATE_NONE
@@ -0,0 +1,298 @@
+
+import os, re, mmap, threading
+from array import array
+from bisect import bisect_left
+from PyQt5.QtCore import Qt, QObject, QRect, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QPainter, QFontMetrics, QGuiApplication, QKeySequence
+from PyQt5.QtWidgets import (QWidget, QAbstractScrollArea, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
+                             QLabel, QCheckBox)
+
+LARGE_FILE_BYTES = 64 * 1024 * 1024   # open_file switches to the paged viewer above this
+BLOCK = 64 * 1024                     # one index entry per block of the file
+MAX_LINE_BYTES = 16 * 1024            # longer lines are cut when displayed
+SEARCH_CHUNK = 4 * 1024 * 1024
+
+
+class LineIndex(QObject):
+    """Sparse line index over a memory-mapped file, built on a background thread.
+
+    `before[i]` is the number of newlines in the first i blocks, so the index costs
+    8 bytes per 64 KiB whatever the line count; a line start is found by bisecting the
+    blocks and scanning at most one block of the mapping.
+    """
+    progress = pyqtSignal(int, float)   # lines so far, fraction of the file indexed
+    finished = pyqtSignal(int)          # line count
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = str(path)
+        self._f = open(self.path, "rb")
+        self.size = os.fstat(self._f.fileno()).st_size
+        self.mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.before = array("Q", [0])
+        self.newlines = 0
+        self.complete = threading.Event()
+        self._cancel = threading.Event()
+        self._threads = []   # (cancel event, thread) of everything reading the mapping
+        self.closed = False
+
+    def start(self):
+        self.run_reader(self._build, self._cancel, "aduska-lineindex")
+
+    def run_reader(self, target, cancel: threading.Event, name):
+        """Run `target` on a thread that reads the mapping; close() sets `cancel` and waits for it."""
+        self._threads = [(c, t) for c, t in self._threads if t.is_alive()]
+        t = threading.Thread(target=target, name=name, daemon=True)
+        self._threads.append((cancel, t)); t.start()
+
+    def close(self):
+        """Stop the builder and any FindJob, then unmap and close the file (no leaked fd, no lock on Windows)."""
+        self._cancel.set()
+        for c, _ in self._threads: c.set()
+        for _, t in self._threads: t.join()   # each checks its event at least every block / chunk
+        self._threads = []; self.closed = True
+        if isinstance(self.mm, mmap.mmap): self.mm.close()
+        self._f.close()
+
+    def _emit(self, sig, *args):
+        try: sig.emit(*args)
+        except RuntimeError: pass
+
+    def _build(self):
+        mm, size, before = self.mm, self.size, self.before
+        total = 0; pos = 0; step = 0
+        while pos < size:
+            if self._cancel.is_set(): return
+            total += mm[pos:pos + BLOCK].count(b"\n")
+            pos += BLOCK
+            self.newlines = total
+            if pos < size: before.append(total)
+            step += 1
+            if step % 256 == 0: self._emit(self.progress, self.line_count(), pos / size)
+        self.complete.set()
+        self._emit(self.finished, self.line_count())
+
+    def line_count(self):
+        """Lines indexed so far (all of them once `complete` is set)."""
+        n = self.newlines
+        if self.complete.is_set() and self.size and self.mm[self.size - 1:self.size] != b"\n": n += 1
+        return n
+
+    def line_start(self, ln: int):
+        """Byte offset where 0-based line `ln` starts (None past the indexed part)."""
+        if ln <= 0: return 0
+        before = self.before
+        i = bisect_left(before, ln) - 1      # last block with fewer than ln newlines before it
+        pos = i * BLOCK; need = ln - before[i]
+        find = self.mm.find
+        while need:
+            pos = find(b"\n", pos)
+            if pos < 0: return None
+            pos += 1; need -= 1
+        return pos if pos <= self.size else None
+
+    def line_of(self, offset: int):
+        i = min(offset // BLOCK, len(self.before) - 1)
+        return self.before[i] + self.mm[i * BLOCK:offset].count(b"\n")
+
+    def line_end(self, start: int):
+        end = self.mm.find(b"\n", start, start + MAX_LINE_BYTES)
+        return end if end >= 0 else min(self.size, start + MAX_LINE_BYTES)
+
+    def text(self, start: int, end: int) -> str:
+        raw = self.mm[start:end]
+        if raw.endswith(b"\r"): raw = raw[:-1]
+        return raw.decode("utf-8", errors="replace").expandtabs(4)
+
+
+class FindJob(QObject):
+    """Searches the mapping chunk by chunk (re holds the GIL, so one big call would freeze the UI)."""
+    found = pyqtSignal(int, int)   # byte offset, byte length; -1 if nothing was found
+
+    def __init__(self, index: LineIndex, needle: bytes, start: int, case=False):
+        super().__init__()
+        self.index = index
+        self.rx = re.compile(re.escape(needle), 0 if case else re.IGNORECASE)
+        self.width = len(needle)
+        self.start_at = start
+        self._cancel = threading.Event()
+
+    def start(self):
+        self.index.run_reader(self._run, self._cancel, "aduska-largefind")
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _scan(self, lo, hi):
+        mm, rx = self.index.mm, self.rx
+        pos = lo
+        while pos < hi and not self._cancel.is_set():
+            end = min(hi, pos + SEARCH_CHUNK)
+            # chunks overlap by the needle width so matches across a boundary are kept
+            m = rx.search(mm[pos:min(self.index.size, end + self.width - 1)])
+            if m: return pos + m.start()
+            pos = end
+        return -1
+
+    def _run(self):
+        hit = self._scan(self.start_at, self.index.size)
+        if hit < 0: hit = self._scan(0, self.start_at)
+        if self._cancel.is_set(): return
+        try: self.found.emit(hit, self.width)
+        except RuntimeError: pass
+
+
+class _LinesView(QAbstractScrollArea):
+    """Paints only the lines in the viewport, straight from the mapping."""
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner
+        font = QFont("Fira Code, Consolas, Monospace"); font.setStyleHint(QFont.Monospace); font.setPointSize(11)
+        self.setFont(font); self.viewport().setFont(font)
+        self.current = 0                 # 0-based line with the cursor
+        self.mark = None                 # (line, col, length) of the last search hit
+        self._widest = 0
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+        self.setFocusPolicy(Qt.StrongFocus)
+
+    def rows(self):
+        return max(1, self.viewport().height() // QFontMetrics(self.font()).lineSpacing())
+
+    def update_range(self, lines):
+        self.verticalScrollBar().setRange(0, max(0, lines - self.rows() + 1))
+        self.verticalScrollBar().setPageStep(self.rows())
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.update_range(self.owner.index.line_count())
+
+    def ensure_visible(self, ln):
+        sb = self.verticalScrollBar()
+        if ln < sb.value() or ln >= sb.value() + self.rows() - 1:
+            sb.setValue(max(0, ln - self.rows() // 3))
+        self.viewport().update()
+
+    def paintEvent(self, e):
+        idx = self.owner.index
+        p = QPainter(self.viewport())
+        fm = QFontMetrics(self.font()); lh = fm.lineSpacing(); cw = fm.horizontalAdvance("9")
+        pal = self.palette()
+        p.fillRect(self.viewport().rect(), pal.base())
+        first = self.verticalScrollBar().value()
+        total = idx.line_count()
+        gutter = cw * (len(str(max(1, total))) + 2)
+        dx = self.horizontalScrollBar().value()
+        start = idx.line_start(first)
+        widest = 0
+        for row in range(self.rows() + 1):
+            ln = first + row
+            if start is None or ln >= total or start > idx.size: break
+            end = idx.line_end(start)
+            text = idx.text(start, end)
+            y = row * lh
+            if ln == self.current: p.fillRect(QRect(0, y, self.viewport().width(), lh), pal.alternateBase())
+            if self.mark and self.mark[0] == ln:
+                p.fillRect(QRect(gutter + self.mark[1] * cw - dx, y, self.mark[2] * cw, lh), pal.highlight())
+            p.setPen(pal.text().color())
+            p.drawText(QRect(gutter - dx, y, len(text) * cw + cw, lh), Qt.AlignLeft | Qt.AlignVCenter, text)
+            p.fillRect(QRect(0, y, gutter - cw // 2, lh), pal.alternateBase())
+            p.setPen(pal.placeholderText().color())
+            p.drawText(QRect(0, y, gutter - cw, lh), Qt.AlignRight | Qt.AlignVCenter, str(ln + 1))
+            widest = max(widest, len(text))
+            start = end + 1 if end < idx.size and idx.mm[end:end + 1] == b"\n" else idx.line_start(ln + 1)
+        p.end()
+        if widest > self._widest:
+            self._widest = widest
+            self.horizontalScrollBar().setRange(0, max(0, (widest + 2) * cw + gutter - self.viewport().width()))
+
+    def mousePressEvent(self, e):
+        lh = QFontMetrics(self.font()).lineSpacing()
+        self.current = min(self.verticalScrollBar().value() + e.pos().y() // lh, max(0, self.owner.index.line_count() - 1))
+        self.owner.cursor_moved()
+        self.viewport().update()
+
+    def keyPressEvent(self, e):
+        k = e.key(); total = self.owner.index.line_count()
+        moves = {Qt.Key_Up: -1, Qt.Key_Down: 1, Qt.Key_PageUp: -self.rows(), Qt.Key_PageDown: self.rows()}
+        if k in moves: self.current += moves[k]
+        elif k == Qt.Key_Home and e.modifiers() & Qt.ControlModifier: self.current = 0
+        elif k == Qt.Key_End and e.modifiers() & Qt.ControlModifier: self.current = total - 1
+        elif e.matches(QKeySequence.Copy): QGuiApplication.clipboard().setText(self.owner.line_text(self.current)); return
+        else: return super().keyPressEvent(e)
+        self.current = max(0, min(self.current, total - 1))
+        self.ensure_visible(self.current); self.owner.cursor_moved()
+
+
+class LargeFileView(QWidget):
+    """Read-only paged viewer for files too big for a QPlainTextEdit."""
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.file_path = path
+        self.index = LineIndex(path, self)
+        self._find = None
+        lay = QVBoxLayout(self); lay.setContentsMargins(0, 0, 0, 0); lay.setSpacing(2)
+        bar = QHBoxLayout(); bar.setContentsMargins(4, 2, 4, 0)
+        self.q = QLineEdit(); self.q.setPlaceholderText("Find in file…")
+        self.chk_case = QCheckBox("Aa"); self.chk_case.setToolTip("Match case")
+        self.btn_next = QPushButton("Next")
+        self.info = QLabel("indexing…")
+        bar.addWidget(self.q, 1); bar.addWidget(self.chk_case); bar.addWidget(self.btn_next); bar.addWidget(self.info)
+        self.view = _LinesView(self)
+        lay.addLayout(bar); lay.addWidget(self.view, 1)
+        self.q.returnPressed.connect(self.find_next); self.btn_next.clicked.connect(self.find_next)
+        self.index.progress.connect(self._on_progress)
+        self.index.finished.connect(self._on_indexed)
+        # tabs are deleteLater()'d, so stop the threads from `destroyed` rather than closeEvent
+        self.destroyed.connect(lambda _=None, close=self.index.close: close())
+        self.index.start()
+
+    def _on_progress(self, lines, frac):
+        self.view.update_range(lines); self.view.viewport().update()
+        self.info.setText(f"indexing {frac:.0%} · {lines:,} lines")
+
+    def _on_indexed(self, lines):
+        self.view.update_range(lines); self.view.viewport().update()
+        self.info.setText(f"{lines:,} lines · {self.index.size / 2**20:,.0f} MiB · read-only")
+
+
+    # ---------- editor-like API used by MainWindow ----------
+    def current_line(self): return self.view.current + 1
+    def current_column(self): return 1
+    def cursor_moved(self):
+        w = self.window()
+        if hasattr(w, "_update_status"): w._update_status()
+
+    def line_text(self, ln):
+        start = self.index.line_start(ln)
+        return "" if start is None else self.index.text(start, self.index.line_end(start))
+
+    def goto_line(self, ln: int):
+        self.view.current = max(0, min(ln - 1, self.index.line_count() - 1))
+        self.view.ensure_visible(self.view.current); self.cursor_moved()
+
+    def find_next(self, text: str = None):
+        text = self.q.text() if not text else text
+        if not text or not self.index.size: return False
+        if self._find: self._find.cancel()
+        start = self.index.line_start(self.view.current + 1 if self.view.mark else self.view.current)
+        self._find = FindJob(self.index, text.encode("utf-8"), start if start is not None else 0, self.chk_case.isChecked())
+        self._find.found.connect(self._on_found)
+        self.info.setText("searching…")
+        self._find.start()
+        return True
+
+    def _on_found(self, offset, length):
+        if self.index.closed: return   # a retry timer that outlived the tab
+        self._find = None
+        if offset < 0:
+            self.info.setText("not found"); return
+        if not self.index.complete.is_set() and offset // BLOCK >= len(self.index.before) - 1:
+            QTimer.singleShot(100, lambda: self._on_found(offset, length)); return   # not indexed that far yet
+        ln = self.index.line_of(offset)
+        start = self.index.line_start(ln)
+        col = len(self.index.text(start, offset))
+        self.view.mark = (ln, col, len(self.index.text(offset, offset + length)))
+        self.view.current = ln
+        self.view.ensure_visible(ln); self.cursor_moved()
+        self.info.setText(f"line {ln + 1:,}")
@@ -0,0 +1,146 @@
+
+import time
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QTextLayout
+from core.highlighter import STATE_NONE
+
+
+class ViewportHighlighter(QObject):
+    """Highlights a large document viewport-first and then in idle-time slices.
+
+    The BlockHighlighter is detached from the document, so Qt never highlights the whole
+    text synchronously. Visible blocks are painted first (their states are chained locally,
+    not stored); an idle timer then walks the document from `_frontier`, storing the real
+    block states. An edit pulls the frontier back to the edited block, and once a block past
+    the edit ends in the same state as before, the walk jumps to where it had already been.
+    """
+    SLICE_SEC = 0.008        # per idle slice
+    EDIT_SLICE_SEC = 0.004   # spent synchronously right after an edit
+
+    def __init__(self, editor, highlighter, parent=None):
+        super().__init__(parent or editor)
+        self.views = []
+        self.hl = highlighter
+        highlighter.setDocument(None)
+        self.doc = editor.document()
+        self._frontier = 0     # blocks below it carry correct formats and states
+        self._known = 0        # blocks below it were correct before the last edits
+        self._resume = -1      # last edited block; no jumping before it has been redone
+        self._count = self.doc.blockCount()
+        self._applying = False
+        self._timer = QTimer(self); self._timer.setInterval(0); self._timer.timeout.connect(self._idle)
+        self._view_timer = QTimer(self); self._view_timer.setSingleShot(True)
+        self._view_timer.timeout.connect(self.paint_visible)
+        self.doc.contentsChange.connect(self._changed)
+        self.add_view(editor)
+
+    def add_view(self, editor):
+        """Another editor showing the same document; its visible blocks are painted too."""
+        self.views.append(editor)
+        editor.verticalScrollBar().valueChanged.connect(self.schedule_view)
+
+    def remove_view(self, editor):
+        if editor in self.views: self.views.remove(editor)
+
+    def done(self):
+        return self._frontier >= self.doc.blockCount()
+
+    def set_highlighter(self, highlighter):
+        highlighter.setDocument(None)
+        self.hl = highlighter
+        self.rehighlight()
+
+    def rehighlight(self):
+        """Start over (e.g. after the colors changed)."""
+        self._frontier = self._known = 0; self._resume = -1
+        self.schedule_view(); self._timer.start()
+
+    def schedule_view(self, *_):
+        if not self._view_timer.isActive(): self._view_timer.start(0)
+
+    def _changed(self, pos, removed, added):
+        if self._applying: return
+        doc = self.doc
+        count = doc.blockCount(); delta = count - self._count; self._count = count
+        first = doc.findBlock(pos).blockNumber()
+        last = doc.findBlock(pos + added)
+        last = last.blockNumber() if last.isValid() else count - 1
+        if self._known > first: self._known = max(first, self._known + delta)
+        if self._frontier > first:
+            self._known = max(self._known, self._frontier + delta)
+            self._frontier = first
+        self._resume = max(last, self._resume + delta if self._resume > first else self._resume)
+        self._run(self.EDIT_SLICE_SEC)
+        self.schedule_view()
+        if not self.done(): self._timer.start()
+
+    def _idle(self):
+        self._run(self.SLICE_SEC)
+        if self.done(): self._timer.stop()
+
+    @staticmethod
+    def _ranges(spans):
+        out = []
+        for s, n, f in spans:
+            r = QTextLayout.FormatRange(); r.start = s; r.length = n; r.format = f
+            out.append(r)
+        return out
+
+    def _run(self, budget):
+        """Walk from the frontier for up to `budget` seconds, storing block states."""
+        doc = self.doc
+        n = self._frontier
+        if n >= doc.blockCount(): return
+        t0 = time.perf_counter()
+        block = doc.findBlockByNumber(n)
+        prev = block.previous()
+        state = prev.userState() if prev.isValid() else STATE_NONE
+        spans_of, ranges = self.hl.spans, self._ranges
+        lo = block.position(); hi = lo
+        self._applying = True
+        try:
+            while block.isValid():
+                old = block.userState()
+                spans, state = spans_of(block.text(), state)
+                block.layout().setFormats(ranges(spans))
+                block.setUserState(state)
+                hi = block.position() + block.length()
+                block = block.next(); n += 1
+                if state == old and n > self._resume and n < self._known:
+                    # the rest up to `_known` is unaffected by the edit
+                    doc.markContentsDirty(lo, hi - lo)
+                    n = self._known; block = doc.findBlockByNumber(n)
+                    lo = hi = block.position() if block.isValid() else hi
+                if time.perf_counter() - t0 > budget: break
+            if hi > lo: doc.markContentsDirty(lo, hi - lo)
+        finally:
+            self._applying = False
+        self._frontier = n
+        if n >= self._known: self._known = 0
+        if n > self._resume: self._resume = -1
+
+    def paint_visible(self):
+        """Format the blocks on screen that the walk has not reached yet."""
+        for ed in self.views: self._paint_view(ed)
+
+    def _paint_view(self, ed):
+        doc = self.doc
+        block = ed.firstVisibleBlock()
+        rows = ed.viewport().height() // max(1, ed.fontMetrics().lineSpacing()) + 2
+        if block.blockNumber() + rows <= self._frontier: return
+        while block.isValid() and block.blockNumber() < self._frontier and rows > 0:
+            block = block.next(); rows -= 1
+        if not block.isValid() or rows <= 0: return
+        prev = block.previous()
+        state = prev.userState() if prev.isValid() else STATE_NONE
+        lo = hi = block.position()
+        self._applying = True
+        try:
+            while block.isValid() and rows > 0:
+                spans, state = self.hl.spans(block.text(), state)
+                block.layout().setFormats(self._ranges(spans))
+                hi = block.position() + block.length()
+                block = block.next(); rows -= 1
+            doc.markContentsDirty(lo, hi - lo)
+        finally:
+            self._applying = False
@@ -1,14 +1,18 @@
 
 # -*- coding: utf-8 -*-
-import sys, json, os
+import sys, json, os, re
 from pathlib import Path
-from PyQt5.QtCore import Qt, QDir, QSettings, QSize, QTimer
-from PyQt5.QtGui import QKeySequence, QPalette, QColor, QFont
+from core import startup_profile
+startup_profile.begin(startup_profile.FLAG in sys.argv)
+from PyQt5 import sip
+from PyQt5.QtCore import Qt, QDir, QSettings, QSize, QTimer, QStandardPaths, QByteArray
+from PyQt5.QtGui import QKeySequence, QPalette, QColor, QFont, QIcon
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QAction, QTreeView, QFileSystemModel,
     QSplitter, QWidget, QVBoxLayout, QTabWidget, QMessageBox, QToolBar, QStatusBar,
     QInputDialog, QShortcut, QDockWidget, QDialog, QFormLayout, QSpinBox, QComboBox,
-    QPushButton, QLabel, QLineEdit, QListWidget, QListWidgetItem, QHBoxLayout, QTextEdit, QFileDialog
+    QPushButton, QLabel, QLineEdit, QListWidget, QListWidgetItem, QHBoxLayout, QTextEdit, QFileDialog,
+    QPlainTextEdit, QCheckBox, QStyle, QProgressBar, QTreeWidget, QTreeWidgetItem
 )
 from core.delegates import SizeDelegate, TypeDelegate, DateDelegate
 from core.code_editor import CodeEditor
@@ -16,6 +20,21 @@ from core.terminal import TerminalWidget
 from core.plugin_manager import PluginManager
 from core.editor_api import EditorAPI
 from core.tabs import DetachableTabWidget
+from core.search import SearchJob, SearchResultsModel
+from core.search_index import TrigramIndex
+from core.search_filter import FileFilter, build_matcher
+from core.replace import ReplaceJob, WriteJob, patch_editor
+from core.quick_open import PathIndex, QuickOpenDialog
+from core.grammars import register_grammar, reset_grammars, grammar_for
+from core.large_file import LargeFileView, LARGE_FILE_BYTES
+from core.file_loader import LoadingTab
+from core.save_service import SaveService
+from core.recovery import RecoveryJournal, replay
+from core.buffers import BufferRegistry, path_key
+from core.hibernate import Hibernator, HibernatedTab
+from core.startup_profile import phase
+from core.tasks import TaskRunner
+startup_profile.record("imports")
 
 APP_NAME = "AduskaCode"
 ORG = "Aduska"
@@ -33,13 +52,21 @@ class SettingsDialog(QDialog):
         self.spin_font = QSpinBox(); self.spin_font.setRange(8, 32); self.spin_font.setValue(11)
         self.spin_tabs = QSpinBox(); self.spin_tabs.setRange(2, 12); self.spin_tabs.setValue(4)
         self.spin_autosave = QSpinBox(); self.spin_autosave.setRange(0, 600); self.spin_autosave.setValue(0)
+        self.chk_fsync = QCheckBox("Flush saves to disk (fsync)")
+        self.spin_budget = QSpinBox(); self.spin_budget.setRange(0, 64 * 1024); self.spin_budget.setSingleStep(64); self.spin_budget.setValue(256)
         self.txt_workspace = QLineEdit()
+        self.spin_hits = QSpinBox(); self.spin_hits.setRange(100, 1000000); self.spin_hits.setSingleStep(1000); self.spin_hits.setValue(10000)
+        self.spin_filekb = QSpinBox(); self.spin_filekb.setRange(16, 1024 * 1024); self.spin_filekb.setSingleStep(512); self.spin_filekb.setValue(2048)
 
         lay.addRow("Theme", self.cmb_theme)
         lay.addRow("Font size", self.spin_font)
         lay.addRow("Tab size (spaces)", self.spin_tabs)
         lay.addRow("Autosave (sec, 0=off)", self.spin_autosave)
+        lay.addRow("", self.chk_fsync)
+        lay.addRow("Open tabs memory (MiB, 0=no limit)", self.spin_budget)
         lay.addRow("Default workspace", self.txt_workspace)
+        lay.addRow("Search hit cap", self.spin_hits)
+        lay.addRow("Search max file size (KiB)", self.spin_filekb)
 
         b = QHBoxLayout()
         ok = QPushButton("OK"); cancel = QPushButton("Cancel")
@@ -53,7 +80,11 @@ class SettingsDialog(QDialog):
             "font_size": self.spin_font.value(),
             "tab_spaces": self.spin_tabs.value(),
             "autosave": self.spin_autosave.value(),
+            "save_fsync": self.chk_fsync.isChecked(),
+            "tab_budget_mb": self.spin_budget.value(),
             "workspace": self.txt_workspace.text().strip(),
+            "search_max_hits": self.spin_hits.value(),
+            "search_max_file_kb": self.spin_filekb.value(),
         }
 
     def set_values(self, data: dict):
@@ -63,49 +94,243 @@ class SettingsDialog(QDialog):
         if "font_size" in data: self.spin_font.setValue(int(data["font_size"]))
         if "tab_spaces" in data: self.spin_tabs.setValue(int(data["tab_spaces"]))
         if "autosave" in data: self.spin_autosave.setValue(int(data["autosave"]))
+        if "save_fsync" in data: self.chk_fsync.setChecked(bool(data["save_fsync"]))
+        if "tab_budget_mb" in data: self.spin_budget.setValue(int(data["tab_budget_mb"]))
         if "workspace" in data: self.txt_workspace.setText(str(data["workspace"]))
+        if "search_max_hits" in data: self.spin_hits.setValue(int(data["search_max_hits"]))
+        if "search_max_file_kb" in data: self.spin_filekb.setValue(int(data["search_max_file_kb"]))
 
 
 class SearchDock(QDockWidget):
     def __init__(self, main):
         super().__init__("Search")
         self.main = main
+        self._job = None
+        self._replace_job = None
+        self._query = ""
+        self._matcher = None
+        self._regex = False
+        self._indexes = {}
+        self._search_args = None   # SearchJob arguments of the shown results, without the hit cap
+        self._complete = False     # the shown results list every matching file (not capped or stopped)
         w = QWidget(); self.setWidget(w)
         lay = QVBoxLayout(w); lay.setContentsMargins(4,4,4,4)
         top = QHBoxLayout()
         self.q = QLineEdit(); self.q.setPlaceholderText("Find in workspace…")
         self.btn = QPushButton("Search")
+        self.btn_stop = QPushButton("Stop"); self.btn_stop.setEnabled(False)
         self.btn.clicked.connect(self.do_search)
+        self.btn_stop.clicked.connect(self.cancel_search)
         self.q.returnPressed.connect(self.do_search)
-        top.addWidget(self.q); top.addWidget(self.btn)
+        top.addWidget(self.q); top.addWidget(self.btn); top.addWidget(self.btn_stop)
         lay.addLayout(top)
-        self.list = QListWidget(); lay.addWidget(self.list)
-        self.list.itemActivated.connect(self.open_hit)
+        rrow = QHBoxLayout()
+        self.r = QLineEdit(); self.r.setPlaceholderText("Replace with…")
+        self.btn_replace = QPushButton("Replace…")
+        self.btn_replace.clicked.connect(self.do_replace)
+        rrow.addWidget(self.r); rrow.addWidget(self.btn_replace)
+        lay.addLayout(rrow)
+        opts = QHBoxLayout()
+        self.chk_case = QCheckBox("Aa"); self.chk_case.setToolTip("Match case")
+        self.chk_word = QCheckBox("Word"); self.chk_word.setToolTip("Whole word")
+        self.chk_regex = QCheckBox(".*"); self.chk_regex.setToolTip("Regular expression")
+        self.chk_gitignore = QCheckBox(".gitignore"); self.chk_gitignore.setToolTip("Skip files ignored by .gitignore")
+        s = main.settings
+        for key, chk, default in (("case", self.chk_case, False), ("word", self.chk_word, False),
+                                  ("regex", self.chk_regex, False), ("gitignore", self.chk_gitignore, True)):
+            chk.setChecked(s.value(f"search/{key}", default, type=bool))
+            chk.toggled.connect(lambda v, k=key: self.main.settings.setValue(f"search/{k}", v))
+            opts.addWidget(chk)
+        opts.addStretch(1)
+        lay.addLayout(opts)
+        self.inc = QLineEdit(s.value("search/include", "")); self.inc.setPlaceholderText("Files to include (e.g. *.py, src/**)")
+        self.exc = QLineEdit(s.value("search/exclude", "")); self.exc.setPlaceholderText("Files to exclude")
+        for key, ed in (("include", self.inc), ("exclude", self.exc)):
+            ed.returnPressed.connect(self.do_search)
+            ed.editingFinished.connect(lambda k=key, e=ed: self.main.settings.setValue(f"search/{k}", e.text()))
+            lay.addWidget(ed)
+        self.model = SearchResultsModel(parent=self)
+        self.view = QTreeView(); self.view.setModel(self.model)
+        self.view.setHeaderHidden(True); self.view.setUniformRowHeights(True)
+        self.view.activated.connect(self.open_hit)
+        lay.addWidget(self.view)
+        self.lbl_progress = QLabel(""); lay.addWidget(self.lbl_progress)
 
     def do_search(self):
-        self.list.clear()
-        text = self.q.text().strip()
+        self.cancel_search()
+        self.model.clear(self.main.workspace_dir); self.lbl_progress.clear()
+        self._complete = False
+        text = self._query = self.q.text().strip()
         if not text: return
-        root = self.main.workspace_dir
-        for p, _, files in os.walk(root):
-            for fn in files:
-                fp = Path(p)/fn
-                try:
-                    data = fp.read_text(encoding="utf-8", errors="ignore")
-                except Exception:
-                    continue
-                for ln, line in enumerate(data.splitlines(), 1):
-                    if text.lower() in line.lower():
-                        item = QListWidgetItem(f"{fp} : {ln}  —  {line.strip()}")
-                        item.setData(Qt.UserRole, (str(fp), ln))
-                        self.list.addItem(item)
-
-    def open_hit(self, item: QListWidgetItem):
-        path, ln = item.data(Qt.UserRole)
-        self.main.open_file(Path(path))
-        w = self.main.current_widget()
-        if isinstance(w, CodeEditor):
-            w.goto_line(ln)
+        self._regex = self.chk_regex.isChecked()
+        try:
+            self._matcher = build_matcher(text, regex=self._regex, case=self.chk_case.isChecked(),
+                                          word=self.chk_word.isChecked())
+        except re.error as e:
+            self._matcher = None
+            self.lbl_progress.setText(f"Invalid regex: {e}"); return
+        max_hits = int(self.main.settings.value("search_max_hits", 10000))
+        globs = lambda ed: [g.strip() for g in ed.text().split(",") if g.strip()]
+        flt = FileFilter(include=globs(self.inc), exclude=globs(self.exc),
+                         use_gitignore=self.chk_gitignore.isChecked(),
+                         max_size=int(self.main.settings.value("search_max_file_kb", 2048)) * 1024)
+        # a regex has no literal the trigram index could narrow on
+        self._search_args = dict(root=self.main.workspace_dir, text=None if self._regex else text,
+                                 index=self._index(flt), matcher=self._matcher, file_filter=flt)
+        job = SearchJob(max_hits=max_hits, **self._search_args)
+        job.hits.connect(lambda hits, j=job: self._on_hits(j, hits))
+        job.progress.connect(lambda n, h, t, j=job: self._on_progress(j, n, h, t))
+        job.finished.connect(lambda cancelled, j=job: self._on_finished(j, cancelled))
+        self._job = job
+        self.btn_stop.setEnabled(True)
+        job.start()
+
+    def _index(self, flt: FileFilter):
+        root = str(self.main.workspace_dir)
+        # the index only depends on the non-glob part of the filter
+        key = (root, flt.signature())
+        idx = self._indexes.get(key)
+        if idx is None:
+            cache = Path(QStandardPaths.writableLocation(QStandardPaths.CacheLocation)) / "search_index"
+            base = FileFilter(use_gitignore=flt.use_gitignore, max_size=flt.max_size, skip_binary=flt.skip_binary)
+            idx = self._indexes[key] = TrigramIndex(root, cache, base)
+        return idx
+
+    def file_changed(self, path):
+        for idx in self._indexes.values():
+            idx.invalidate(path)
+
+    def cancel_search(self):
+        if self._job:
+            self._job.cancel()
+            self._job = None
+        self.btn_stop.setEnabled(False)
+
+    def _on_hits(self, job, hits):
+        if job is not self._job: return
+        self.model.add_hits(hits)
+
+    def _on_progress(self, job, scanned, nhits, elapsed):
+        if job is not self._job: return
+        rate = nhits / elapsed if elapsed > 0 else 0.0
+        self.lbl_progress.setText(f"{scanned} files scanned · {nhits} hits · {rate:.0f} hits/s")
+
+    def _on_finished(self, job, cancelled):
+        if job is not self._job: return
+        self._job = None
+        self.btn_stop.setEnabled(False)
+        self._complete = not cancelled and not job.capped
+        state = "cancelled" if cancelled else f"capped at {job.max_hits} hits" if job.capped else "done"
+        self.lbl_progress.setText(f"{self.lbl_progress.text()}  ({state})")
+
+    # ---------- replace in files ----------
+    def do_replace(self):
+        if self._replace_job: return
+        if self._job or not self._matcher or not self.model.rowCount():
+            self.main.status.showMessage("Run a search first; Replace works on its results", 3000); return
+        if self._complete: return self._prepare_replace(self.model.paths(), self._matcher, self._regex)
+        # the results stop at the hit cap (or were stopped): find every matching file again, uncapped
+        job = SearchJob(**self._search_args)
+        paths = []
+        job.hits.connect(lambda hits: paths.extend(p for p, _ in hits))
+        job.progress.connect(lambda n, h, t: self.lbl_progress.setText(f"Listing all matching files… {n} scanned"))
+        job.finished.connect(lambda _, m=self._matcher, rx=self._regex: self._prepare_replace(paths, m, rx))
+        self._replace_job = job
+        self.btn_replace.setEnabled(False)
+        job.start()
+
+    def _prepare_replace(self, paths, matcher, regex):
+        text = self.r.text()
+        # regex mode allows \1 / \g<name> in the replacement
+        repl = (lambda m: m.expand(text)) if regex else text
+        snap = {p: ed.toPlainText() for p, ed in self.main.open_editors().items()}
+        for h in self.main.sleeping_tabs():
+            if h.modified: snap[os.path.abspath(str(h.file_path))] = h.text()
+        job = ReplaceJob([os.path.abspath(p) for p in paths], matcher, repl, snap)
+        job.progress.connect(lambda d, t: self.lbl_progress.setText(f"Preparing replace… {d}/{t} files"))
+        job.finished.connect(lambda edits: self._on_replace_ready(matcher, repl, edits))
+        self._replace_job = job
+        self.btn_replace.setEnabled(False)
+        job.start()
+
+    def _on_replace_ready(self, matcher, repl, edits):
+        self._replace_job = None
+        self.btn_replace.setEnabled(True)
+        if not edits:
+            self.lbl_progress.setText("Nothing to replace"); return
+        dlg = ReplacePreviewDialog(self.main, edits, str(self.main.workspace_dir))
+        if dlg.exec_() != QDialog.Accepted:
+            self.lbl_progress.setText("Replace cancelled"); return
+        chosen = dlg.selected()
+        editors = self.main.open_editors()
+        patched = 0
+        for e in chosen:
+            if e.in_editor and e.path in editors:
+                patched += patch_editor(editors[e.path], matcher, repl)
+            elif e.in_editor:
+                # unsaved changes of a sleeping tab: wake it and patch once it is back
+                self.main.open_file(Path(e.path), on_ready=lambda ed: patch_editor(ed, matcher, repl))
+        disk = [e for e in chosen if not e.in_editor]
+        if not disk:
+            self._replace_done([], patched); return
+        job = WriteJob(disk)
+        job.progress.connect(lambda d, t: self.lbl_progress.setText(f"Writing… {d}/{t} files"))
+        job.finished.connect(lambda res: self._replace_done(res, patched))
+        self._replace_job = job
+        self.btn_replace.setEnabled(False)
+        job.start()
+
+    def _replace_done(self, results, patched):
+        self._replace_job = None
+        self.btn_replace.setEnabled(True)
+        failed = [(p, err) for p, err in results if err]
+        for p, err in results:
+            if not err: self.file_changed(p)
+        msg = f"Replaced in {len(results) - len(failed)} file(s)"
+        if patched: msg += f", {patched} occurrence(s) in open editors"
+        self.main.status.showMessage(msg, 5000)
+        if failed:
+            QMessageBox.warning(self.main, "Replace in Files",
+                                "Some files were not written:\n" + "\n".join(f"{p}: {err}" for p, err in failed[:50]))
+        self.do_search()
+
+    def open_hit(self, index):
+        if not index.parent().isValid(): return  # file rows just expand/collapse
+        loc = self.model.location(index)
+        if not loc: return
+        path, ln = loc
+        self.main.open_file(Path(path), on_ready=lambda w: w.goto_line(ln) if hasattr(w, "goto_line") else None)
+
+
+class ReplacePreviewDialog(QDialog):
+    def __init__(self, parent, edits, root=""):
+        super().__init__(parent)
+        self.setWindowTitle("Replace in Files — Preview")
+        self.resize(980, 640)
+        self.edits = sorted(edits, key=lambda e: e.path)
+        lay = QVBoxLayout(self)
+        total = sum(e.count for e in self.edits)
+        lay.addWidget(QLabel(f"{total} occurrence(s) in {len(self.edits)} file(s). Uncheck files to skip them."))
+        split = QSplitter(Qt.Horizontal)
+        self.list = QListWidget()
+        for e in self.edits:
+            rel = os.path.relpath(e.path, root) if root else e.path
+            item = QListWidgetItem(f"{rel}  ({e.count})" + ("  [open]" if e.in_editor else ""))
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable); item.setCheckState(Qt.Checked)
+            self.list.addItem(item)
+        self.diff = QPlainTextEdit(); self.diff.setReadOnly(True); self.diff.setLineWrapMode(QPlainTextEdit.NoWrap)
+        split.addWidget(self.list); split.addWidget(self.diff); split.setStretchFactor(1, 2)
+        lay.addWidget(split)
+        self.list.currentRowChanged.connect(lambda r: self.diff.setPlainText(self.edits[r].diff if r >= 0 else ""))
+        self.list.setCurrentRow(0)
+        b = QHBoxLayout()
+        ok = QPushButton("Replace"); cancel = QPushButton("Cancel")
+        ok.clicked.connect(self.accept); cancel.clicked.connect(self.reject)
+        b.addStretch(1); b.addWidget(ok); b.addWidget(cancel)
+        lay.addLayout(b)
+
+    def selected(self):
+        return [e for i, e in enumerate(self.edits) if self.list.item(i).checkState() == Qt.Checked]
 
 
 class ExtensionManager(QDialog):
@@ -113,30 +338,52 @@ class ExtensionManager(QDialog):
         super().__init__(main)
         self.main = main
         self.setWindowTitle("Extension Manager")
-        self.resize(560, 400)
+        self.resize(720, 560)
         lay = QVBoxLayout(self)
         self.info = QLabel("Installed extensions (.extend):")
         self.list = QListWidget()
         self.btn_reload = QPushButton("Reload")
+        self.btn_reload_all = QPushButton("Reload All")
         self.btn_toggle = QPushButton("Disable/Enable")
         self.btn_uninstall = QPushButton("Uninstall (Delete file)")
         self.btn_install = QPushButton("Install…")
         self.btn_open_dir = QPushButton("Show Extensions Folder")
 
         row = QHBoxLayout()
-        for b in (self.btn_reload, self.btn_toggle, self.btn_uninstall, self.btn_install, self.btn_open_dir):
+        for b in (self.btn_reload, self.btn_reload_all, self.btn_toggle, self.btn_uninstall, self.btn_install, self.btn_open_dir):
             row.addWidget(b)
         row.addStretch(1)
 
-        lay.addWidget(self.info); lay.addWidget(self.list); lay.addLayout(row)
+        # requirement installs run in the background; show what pip is doing
+        self.install_label = QLabel(); self.install_bar = QProgressBar(); self.install_bar.setRange(0, 0)
+        self.install_label.setWordWrap(True)
+
+        # time and memory spent in each extension's code this session
+        self.perf = QTreeWidget(); self.perf.setRootIsDecorated(False)
+        self.perf.setHeaderLabels(["Extension", "Import ms", "on_load ms", "Open (calls / max ms)", "Commands (calls / max ms)", "Memory MiB"])
+        self.spin_warn = QSpinBox(); self.spin_warn.setRange(1, 60000); self.spin_warn.setSuffix(" ms")
+        self.spin_warn.setValue(int(main.settings.value("ext_warn_ms", 100)))
+        self.spin_warn.valueChanged.connect(lambda v: (self.main.settings.setValue("ext_warn_ms", v), self._refresh()))
+        warn_row = QHBoxLayout(); warn_row.addWidget(QLabel("Performance (warn when a single call takes over")); warn_row.addWidget(self.spin_warn)
+        warn_row.addWidget(QLabel(")")); warn_row.addStretch(1)
+
+        lay.addWidget(self.info); lay.addWidget(self.list); lay.addWidget(self.install_label); lay.addWidget(self.install_bar)
+        lay.addLayout(warn_row); lay.addWidget(self.perf); lay.addLayout(row)
+        installer = main.plugin_manager.installer
+        installer.started.connect(self._install_progress)
+        installer.progress.connect(self._install_progress)
+        installer.finished.connect(self._install_finished)
+        self.finished.connect(self._disconnect_installer)   # the installer outlives the dialog
 
         self.btn_reload.clicked.connect(self._reload)
+        self.btn_reload_all.clicked.connect(self._reload_all)
         self.btn_toggle.clicked.connect(self._toggle)
         self.btn_uninstall.clicked.connect(self._uninstall)
         self.btn_install.clicked.connect(self._install)
         self.btn_open_dir.clicked.connect(self._open_dir)
 
         self._refresh()
+        self._install_progress()
 
     def _refresh(self):
         self.list.clear()
@@ -146,12 +393,63 @@ class ExtensionManager(QDialog):
             for child in sorted(ext_dir.iterdir()):
                 if child.suffix == ".extend" or child.name.endswith(".extend"):
                     item = QListWidgetItem(child.name)
-                    state = "[disabled]" if (child.name in disabled) else "[enabled]"
+                    pm = self.main.plugin_manager
+                    state = "[disabled]" if (child.name in disabled) else "[enabled, loads on use]" if child.name in pm.pending else "[enabled]"
+                    if pm.installer.state(child.name): state += f" ({pm.installer.state(child.name)})"
+                    slow = pm.stats.worst_ms(child.name) > self.spin_warn.value()
+                    if slow:
+                        state += f"  ⚠ slow ({pm.stats.worst_ms(child.name):.0f} ms)"
+                        item.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxWarning))
                     item.setText(f"{child.name}  {state}")
                     item.setData(Qt.UserRole, child.name)
                     self.list.addItem(item)
+        self._refresh_perf()
+
+    def _refresh_perf(self):
+        self.perf.clear()
+        stats, limit = self.main.plugin_manager.stats, self.spin_warn.value()
+        def cell(kind, ext):
+            rec = stats.get(ext, kind)
+            if rec is None: return ""
+            calls, total, worst, _ = rec
+            return f"{worst * 1000:.1f}" if kind in ("import", "on_load") else f"{calls} / {worst * 1000:.1f}"
+        for ext in sorted(stats.data, key=lambda e: -stats.worst_ms(e)):
+            it = QTreeWidgetItem([ext] + [cell(k, ext) for k in stats.KINDS] + [f"{stats.memory(ext) / 2**20:.1f}"])
+            for c in range(1, 6): it.setTextAlignment(c, Qt.AlignRight | Qt.AlignVCenter)
+            if stats.worst_ms(ext) > limit:
+                it.setIcon(0, self.style().standardIcon(QStyle.SP_MessageBoxWarning))
+                for c in range(6): it.setForeground(c, QColor("#d9822b"))
+            self.perf.addTopLevelItem(it)
+        for c in range(6): self.perf.resizeColumnToContents(c)
+
+    def _install_progress(self, ext=None, line=None):
+        installer = self.main.plugin_manager.installer
+        self.install_bar.setVisible(installer.busy())
+        self.install_label.setVisible(installer.busy())
+        if installer.busy(): self.install_label.setText(f"{installer.current}: {installer.state(installer.current)}")
+        if line is None: self._refresh()   # a new install started
+
+    def _install_finished(self, ext, ok):
+        self._install_progress(ext)
+
+    def _disconnect_installer(self, *_):
+        installer = self.main.plugin_manager.installer
+        for sig, slot in ((installer.started, self._install_progress), (installer.progress, self._install_progress),
+                          (installer.finished, self._install_finished)):
+            try: sig.disconnect(slot)
+            except TypeError: pass   # already disconnected
 
     def _reload(self):
+        """Reload the selected extension only; the others keep their docks, menus and state."""
+        item = self.list.currentItem()
+        if not item: return
+        name = item.data(Qt.UserRole)
+        disabled = self.main.settings.value("disabled_extensions", [], type=list)
+        self.main.plugin_manager.reload(name, disabled)
+        self.main.status.showMessage(f"Reloaded {name}", 3000)
+        self._refresh()
+
+    def _reload_all(self):
         self.main.reload_extensions()
         self._refresh()
 
@@ -163,6 +461,8 @@ class ExtensionManager(QDialog):
         if name in disabled: disabled.remove(name)
         else: disabled.add(name)
         self.main.settings.setValue("disabled_extensions", list(disabled))
+        # takes effect right away, for this extension alone
+        self.main.plugin_manager.reload(name, disabled)
         self._refresh()
 
     def _uninstall(self):
@@ -170,6 +470,7 @@ class ExtensionManager(QDialog):
         if not item: return
         name = item.data(Qt.UserRole)
         ext_dir = Path(__file__).resolve().parent.parent / "extensions"
+        self.main.plugin_manager.unload(name)
         try:
             (ext_dir/name).unlink(missing_ok=True)
         except Exception as e:
@@ -185,6 +486,7 @@ class ExtensionManager(QDialog):
             if str(Path(path)) != str(dst):
                 data = Path(path).read_bytes()
                 dst.write_bytes(data)
+            self.main.plugin_manager.reload(dst.name, self.main.settings.value("disabled_extensions", [], type=list))
             QMessageBox.information(self, "Install", f"Installed {dst.name}")
         except Exception as e:
             QMessageBox.critical(self, "Install", f"Failed: {e}")
@@ -205,41 +507,50 @@ class MainWindow(QMainWindow):
         self.workspace_dir = Path(self.settings.value("workspace_dir", str(Path.home())))
         self.themes = {}
         self.current_theme = None
+        self._recolor_queue = []
+        self._recolor_timer = QTimer(self); self._recolor_timer.setInterval(0)
+        self._recolor_timer.timeout.connect(self._recolor_next)
         self.custom_menus = {}
         self.commands = {}
         self.file_handlers = {}
         self.menu_panels = None
         self.panel_actions = {}
         self.docks = {}
-        self.plugin_docks = []
-        self.plugin_menu_actions = []
-        self.plugin_commands = []
-        self.plugin_file_handlers = []
-        self.plugin_themes = set()
-        self.plugin_status_widgets = []
-
-        self._build_ui()
-
+        self.contributions = {}   # extension (True if unknown) -> [(kind, ...)], see remove_contributions
+        self.recent_files = self.settings.value("recent_files", [], type=list)
+        self.path_index = PathIndex(self)
+        self.buffers = BufferRegistry()
+        self._loading = {}   # path key -> LoadingTab still reading that file
+        self.saver = SaveService(self, fsync=self.settings.value("save_fsync", False, type=bool))
+        self.saver.saved.connect(self._on_saved)
+        self.saver.failed.connect(self._on_save_failed)
+        self.recovery = RecoveryJournal(Path(QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)) / "recovery", self)
+
+        with phase("_build_ui"): self._build_ui()
+        self.hibernator = Hibernator(self, int(self.settings.value("tab_budget_mb", 256)))
+
+        self.tasks = TaskRunner(self)     # background work for extensions, see EditorAPI.run_in_thread
         self.api = EditorAPI(self)
         self.plugin_manager = PluginManager(self)
 
         self._register_builtin_commands()
 
         self._rebuild_theme_menu()
-        self.reload_extensions()
+        with phase("extensions"): self.reload_extensions()
 
-        pref = self.settings.value("pref_theme", "")
-        if pref and pref in self.themes:
-            self.apply_theme(pref)
-        elif self.themes:
-            self.apply_theme(next(iter(self.themes.keys())))
+        with phase("apply_theme"):
+            pref = self.settings.value("pref_theme", "")
+            if pref and pref in self.themes:
+                self.apply_theme(pref)
+            elif self.themes:
+                self.apply_theme(next(iter(self.themes.keys())))
 
-        self.set_workspace(self.workspace_dir)
+        with phase("set_workspace"): self.set_workspace(self.workspace_dir)
 
-        QTimer.singleShot(50, self._restore_session)
+        QTimer.singleShot(50, self._startup_session)
 
         self.autosave_sec = int(self.settings.value("autosave", 0))
-        self._autosave_timer = QTimer(self); self._autosave_timer.timeout.connect(self.save_all)
+        self._autosave_timer = QTimer(self); self._autosave_timer.timeout.connect(lambda: self.save_all(autosave=True))
         if self.autosave_sec > 0:
             self._autosave_timer.start(self.autosave_sec * 1000)
 
@@ -263,12 +574,13 @@ class MainWindow(QMainWindow):
         self.act_open = QAction("Open File...", self, shortcut=QKeySequence.Open, triggered=self.open_file_dialog)
         self.act_open_with = QAction("Open File With…", self, triggered=self.open_file_with_dialog)
         self.act_open_ws = QAction("Open Workspace...", self, triggered=self.open_workspace_dialog)
+        self.act_quick_open = QAction("Quick Open…", self, shortcut=QKeySequence("Ctrl+P"), triggered=self.quick_open)
         self.act_save = QAction("Save", self, shortcut=QKeySequence.Save, triggered=self.save_current)
         self.act_save_as = QAction("Save As...", self, shortcut=QKeySequence.SaveAs, triggered=self.save_current_as)
-        self.act_save_all = QAction("Save All", self, triggered=self.save_all)
+        self.act_save_all = QAction("Save All", self, triggered=lambda: self.save_all())
         self.act_close_tab = QAction("Close Tab", self, shortcut=QKeySequence("Ctrl+W"), triggered=lambda: self._close_tab(self.active_tabs().currentIndex()))
         self.act_exit = QAction("Exit", self, shortcut=QKeySequence.Quit, triggered=self.close)
-        self.menu_file.addActions([self.act_new, self.act_open, self.act_open_with, self.act_open_ws])
+        self.menu_file.addActions([self.act_new, self.act_open, self.act_quick_open, self.act_open_with, self.act_open_ws])
         self.menu_file.addSeparator()
         self.menu_file.addActions([self.act_save, self.act_save_as, self.act_save_all])
         self.menu_file.addSeparator()
@@ -342,7 +654,7 @@ class MainWindow(QMainWindow):
         self._register_panel_toggle("Explorer", self.explorer_dock)
 
         # Terminal (dock)
-        self.terminal = TerminalWidget(self)
+        with phase("TerminalWidget spawn"): self.terminal = TerminalWidget(self)
         self.terminal_dock = QDockWidget("Terminal", self)
         self.terminal_dock.setObjectName("TerminalDock")
         self.terminal_dock.setWidget(self.terminal)
@@ -405,8 +717,7 @@ class MainWindow(QMainWindow):
 
     def add_status_widget(self, widget, plugin=False):
         self.status.addPermanentWidget(widget)
-        if plugin:
-            self.plugin_status_widgets.append(widget)
+        self.note_contribution(plugin, "status", widget)
         # ---------- dirty indicator ----------
     def _attach_editor_signals(self, editor_widget):
         """Attach dirty-change tracking to the editor tab once."""
@@ -420,6 +731,7 @@ class MainWindow(QMainWindow):
             lambda dirty, w=editor_widget: self._update_tab_dirty(w, dirty)
         )
         editor_widget._dirty_hooked = True
+        if isinstance(editor_widget, CodeEditor): self.recovery.attach(editor_widget)
 
     def _update_tab_dirty(self, editor_widget, dirty: bool):
         containers = (self.left_tabs, self.right_tabs)
@@ -441,7 +753,7 @@ class MainWindow(QMainWindow):
                 continue
             for i in range(tw.count()):
                 w = tw.widget(i)
-                if isinstance(w, CodeEditor) and w.document().isModified():
+                if (isinstance(w, CodeEditor) and w.document().isModified()) or getattr(w, "modified", False) is True:
                     any_dirty = True
                     break
             if any_dirty:
@@ -499,6 +811,22 @@ class MainWindow(QMainWindow):
     def _focus_search(self):
         self.search_dock.raise_(); self.search_dock.activateWindow(); self.search_dock.q.setFocus()
 
+    def _focus_replace_in_files(self):
+        self._focus_search(); self.search_dock.r.setFocus()
+
+    def sleeping_tabs(self):
+        return [w for tabs in (self.left_tabs, self.right_tabs) for i in range(tabs.count())
+                for w in [tabs.widget(i)] if isinstance(w, HibernatedTab)]
+
+    def open_editors(self):
+        """One open CodeEditor per file, keyed by absolute path. Found through the buffers, so editors
+        in detached windows count too."""
+        out = {}
+        for buf in self.buffers:
+            ed = next((v for v in buf.views if not v.is_loading()), None)
+            if ed is not None and buf.file_path: out[os.path.abspath(str(buf.file_path))] = ed
+        return out
+
     def active_tabs(self) -> QTabWidget:
         return self.left_tabs if self.left_tabs.hasFocus() or (not self.right_tabs.hasFocus() and self.left_tabs.count()>0) else self.right_tabs
 
@@ -547,7 +875,7 @@ class MainWindow(QMainWindow):
         src.removeTab(i)
         if src is self.right_tabs:
             self._maybe_hide_right_split()
-        win = QMainWindow(); win.setWindowTitle(text)
+        win = QMainWindow(self); win.setWindowTitle(text)   # parented, or Python would delete it (and the editor) right away
         if icon is not None and not icon.isNull():
             win.setWindowIcon(icon)
         win.setCentralWidget(w); win.resize(800, 600); win.show()
@@ -556,11 +884,13 @@ class MainWindow(QMainWindow):
         self.register_command("New File", self.new_file, "Ctrl+N")
         self.register_command("Open File…", self.open_file_dialog, "Ctrl+O")
         self.register_command("Open File With…", self.open_file_with_dialog)
+        self.register_command("Quick Open…", self.quick_open)
         self.register_command("Save", self.save_current, "Ctrl+S")
         self.register_command("Toggle Explorer", lambda: self.act_toggle_explorer.trigger(), "Ctrl+B")
         self.register_command("Toggle Terminal", lambda: self.act_toggle_term.trigger(), "Ctrl+J")
         self.register_command("Find…", self.find_dialog, "Ctrl+F")
         self.register_command("Replace…", self.replace_dialog, "Ctrl+H")
+        self.register_command("Replace in Files…", self._focus_replace_in_files, "Ctrl+Shift+H")
         self.register_command("Go to Line…", self.goto_line_dialog, "Ctrl+G")
         self.register_command("Run Current .py", self.run_current_file, "F5")
         self.register_command("Move Tab to Other Pane", self.move_tab_to_other_pane, "Ctrl+\\")
@@ -588,8 +918,7 @@ class MainWindow(QMainWindow):
             act = QAction(name, self, shortcut=QKeySequence(shortcut), triggered=callback)
             self.addAction(act)
         self.commands[name] = (callback, act)
-        if plugin:
-            self.plugin_commands.append(name)
+        self.note_contribution(plugin, "command", name, callback)
 
     def register_file_handler(self, suffixes, name: str, factory, plugin=False):
         for s in suffixes:
@@ -598,8 +927,15 @@ class MainWindow(QMainWindow):
             # remove any existing handler with same name to avoid duplicates
             lst[:] = [(n,f) for (n,f) in lst if n != name]
             lst.append((name, factory))
-            if plugin:
-                self.plugin_file_handlers.append((s, name))
+            self.note_contribution(plugin, "handler", s, factory)
+
+    def register_grammar(self, spec: dict, plugin=False):
+        name = register_grammar(spec)
+        self.note_contribution(plugin, "grammar", name, spec)
+        # files already open with one of its suffixes switch over
+        for ed in self.open_editors().values():
+            if grammar_for(ed.file_path) == name: ed.set_language(ed.file_path, force=True)
+        return name
 
     def _handler_for_suffix(self, suffix: str, name: str = None):
         items = self.file_handlers.get(suffix.lower(), [])
@@ -632,13 +968,13 @@ class MainWindow(QMainWindow):
                 menu.removeAction(a)
         act = QAction(action_name, self, triggered=callback)
         menu.addAction(act)
-        if plugin:
-            self.plugin_menu_actions.append((menu, act))
+        self.note_contribution(plugin, "menu", menu, act)
+        return act
 
     def register_dock(self, title: str, widget, area: str = "left", plugin=False):
         # remove previous dock with same title if it was plugin-provided
         old = self.docks.get(title)
-        if old and old in self.plugin_docks:
+        if old and any(c[:3] == ("dock", title, old) for items in self.contributions.values() for c in items):
             self.removeDockWidget(old)
             try:
                 self.panel_actions.get(title).setChecked(False)
@@ -650,8 +986,7 @@ class MainWindow(QMainWindow):
         area_map = {"left": Qt.LeftDockWidgetArea, "right": Qt.RightDockWidgetArea, "bottom": Qt.BottomDockWidgetArea, "top": Qt.TopDockWidgetArea}
         self.addDockWidget(area_map.get(area, Qt.LeftDockWidgetArea), dock)
         self._register_panel_toggle(title, dock)
-        if plugin:
-            self.plugin_docks.append(dock)
+        self.note_contribution(plugin, "dock", title, dock)
 
     def new_file(self):
         ed = CodeEditor(self); ed.file_path = None
@@ -661,6 +996,18 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getOpenFileName(self, "Open File", str(self.workspace_dir))
         if path: self.open_file(Path(path))
 
+    def quick_open(self):
+        root = str(self.workspace_dir)
+        recent = [os.path.relpath(p, root).replace(os.sep, "/") for p in self.recent_files
+                  if p.startswith(root + os.sep) and os.path.isfile(p)]
+        dlg = QuickOpenDialog(self, self.path_index, recent)
+        dlg.exec_(); dlg.deleteLater()
+
+    def _note_recent(self, path):
+        p = os.path.abspath(str(path))
+        self.recent_files = [p] + [r for r in self.recent_files if r != p][:49]
+        self.settings.setValue("recent_files", self.recent_files)
+
     def open_file_with_dialog(self):
         path, _ = QFileDialog.getOpenFileName(self, "Open File With", str(self.workspace_dir))
         if not path: return
@@ -673,7 +1020,8 @@ class MainWindow(QMainWindow):
         if ok and name:
             self.open_file(Path(path), handler_name=name)
 
-    def open_file(self, path: Path, pane: str = "active", handler_name: str = None):
+    def open_file(self, path: Path, pane: str = "active", handler_name: str = None, on_ready=None):
+        """Open `path` in a tab; text files load off-thread, `on_ready(widget)` runs once the content is in."""
         suffix = path.suffix.lower()
         handler = self._handler_for_suffix(suffix, name=handler_name)
         if handler:
@@ -683,38 +1031,105 @@ class MainWindow(QMainWindow):
                 if getattr(w, "file_path", None) is None:
                     setattr(w, "file_path", path)
                 self.add_tab(w, path.name, pane=pane)
+                self._note_recent(path)
                 self.status.showMessage(f"Opened {path} with {name}", 3000)
+                if on_ready: on_ready(w)
                 return
             except Exception as e:
                 QMessageBox.critical(self, "Handler Error", str(e))
         try:
-            text = Path(path).read_text(encoding="utf-8", errors="replace")
+            if os.path.getsize(path) > LARGE_FILE_BYTES:
+                # paged, read-only view over a memory map instead of a QTextDocument
+                w = LargeFileView(Path(path), self)
+                self.add_tab(w, Path(path).name, pane=pane)
+                self._note_recent(path)
+                if on_ready: on_ready(w)
+                return
         except Exception as e:
             QMessageBox.critical(self, "Open Error", str(e)); return
-        ed = CodeEditor(self); ed.file_path = Path(path); ed.setPlainText(text)
-        self.add_tab(ed, ed.file_path.name, pane=pane)
+        if self._open_view(path, pane, on_ready): return
+        # reading and decoding happen on a worker; the placeholder is swapped for the editor
+        tab = LoadingTab(Path(path), self)
+        tab.waiters = [on_ready] if on_ready else []
+        tab.loaded.connect(lambda text, enc, tab=tab: self._finish_open(tab, text, enc))
+        self.add_tab(tab, Path(path).name, pane=pane)
+        self.note_loading(path, tab)
+        self._note_recent(path)
+        tab.start()
+
+    def note_loading(self, path, tab):
+        """Remember that `tab` (a LoadingTab) stands for `path` until it is swapped for an editor or deleted."""
+        key = path_key(path)
+        self._loading[key] = tab
+        tab.destroyed.connect(lambda _=None, k=key, t=tab: self._loading.get(k) is t and self._loading.pop(k))
+
+    def _open_view(self, path, pane, on_ready=None) -> bool:
+        """Reuse the file's buffer if it is open (or loading): focus its tab in that pane, else add a view."""
+        tabs = self.left_tabs if pane == "left" else self.right_tabs if pane == "right" else self.active_tabs()
+        tab = self._loading.get(path_key(path))
+        if tab is not None and sip.isdeleted(tab): tab = None
+        if tab is not None and self._tab_of(tab)[0] is not None:
+            tw, i = self._tab_of(tab); tw.setCurrentIndex(i)
+            if on_ready: tab.waiters.append(on_ready)
+            return True
+        buf = self.buffers.get(path)
+        if buf is None: return False
+        ed = next((v for v in buf.views if tabs.indexOf(v) >= 0), None)
+        if ed is not None:
+            tabs.setCurrentWidget(ed)
+        else:
+            # another view on the same document: own cursor and scroll position
+            ed = CodeEditor(self, buffer=buf)
+            self.add_tab(ed, Path(path).name, pane=pane)
+        ed.setFocus()
+        if on_ready: on_ready(ed)
+        return True
+
+    def _finish_open(self, tab, text, encoding, modified=False):
+        key = path_key(tab.file_path)
+        if self._loading.get(key) is tab: del self._loading[key]
+        tabs = next((t for t in (self.left_tabs, self.right_tabs) if t.indexOf(tab) >= 0), None)
+        if tabs is None: return   # closed while loading
+        ed = CodeEditor(self); ed.file_path = tab.file_path; ed.encoding = encoding
+        self.buffers.register(ed.buffer)
+        ed.set_language(ed.file_path)
+        on_ready = (lambda ed, ws=tab.waiters: [cb(ed) for cb in ws]) if tab.waiters else None
+        i = tabs.indexOf(tab); current = tabs.currentIndex() == i
+        tabs.blockSignals(True)   # removing the current tab would briefly select (and wake) a neighbour
+        try:
+            tabs.insertTab(i, ed, tabs.tabIcon(i), tabs.tabText(i)); tabs.setTabToolTip(i, tabs.tabToolTip(i + 1))
+            tabs.removeTab(i + 1)
+            if current: tabs.setCurrentIndex(i)
+        finally:
+            tabs.blockSignals(False)
+        tab.deleteLater()
+        if current: ed.setFocus()
+        ed.load_text(text, done=lambda: (ed.document().setModified(modified), self._editor_loaded(ed, on_ready)))
+
+    def _editor_loaded(self, ed, on_ready=None):
+        self._attach_editor_signals(ed)
+        self._update_tab_dirty(ed, ed.document().isModified())
+        self._update_status()
+        if on_ready: on_ready(ed)
 
     def save_current(self):
         w = self.current_widget()
         if not w: return
+        if isinstance(w, HibernatedTab): return w.save_via(self.saver)
         if hasattr(w, "save") and callable(getattr(w, "save")):
             try:
                 w.save(); self.status.showMessage("Saved", 2000); return
             except Exception as e:
                 QMessageBox.critical(self, "Save Error", str(e)); return
         if isinstance(w, CodeEditor):
+            if not self._savable(w): return self.status.showMessage("Not saved: the editor is read-only or still loading", 3000)
             if getattr(w, "file_path", None) is None: return self.save_current_as()
-            try:
-                w.file_path.write_text(w.toPlainText(), encoding="utf-8")
-                w.document().setModified(False)
-                self._refresh_tab_title(self.active_tabs(), w)
-                self.status.showMessage(f"Saved {w.file_path}", 3000)
-            except Exception as e:
-                QMessageBox.critical(self, "Save Error", str(e))
+            self.saver.save([w])
 
     def save_current_as(self):
         w = self.current_widget()
         if not w: return
+        if isinstance(w, CodeEditor) and not self._savable(w): return self.status.showMessage("Not saved: the editor is read-only or still loading", 3000)
         path, _ = QFileDialog.getSaveFileName(self, "Save As", str(self.workspace_dir))
         if not path: return
         if hasattr(w, "save_as") and callable(getattr(w, "save_as")):
@@ -723,27 +1138,64 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Save Error", str(e)); return
         if isinstance(w, CodeEditor):
-            try:
-                w.file_path = Path(path)
-                w.file_path.write_text(w.toPlainText(), encoding="utf-8")
-                w.document().setModified(False)
-                self._refresh_tab_title(self.active_tabs(), w)
-                self.status.showMessage(f"Saved {w.file_path}", 3000)
-            except Exception as e:
-                QMessageBox.critical(self, "Save Error", str(e))
-
-    def save_all(self):
+            w.file_path = Path(path); w.set_language(w.file_path); self.buffers.register(w.buffer)
+            for tabs in (self.left_tabs, self.right_tabs): self._refresh_tab_title(tabs, w)
+            self._update_tab_dirty(w, w.document().isModified())
+            self.saver.save([w])
+
+    @staticmethod
+    def _savable(ed):
+        # a read-only editor, or one still filling in chunks, holds only part of its file
+        return not ed.isReadOnly() and not ed.is_loading()
+
+    def save_all(self, autosave=False):
+        """Save the modified documents; autosave also skips editors whose last save is still in flight."""
+        editors = []; docs = set()
         for tabs in (self.left_tabs, self.right_tabs):
             for i in range(tabs.count()):
                 w = tabs.widget(i)
-                if hasattr(w, "save"):
+                if isinstance(w, HibernatedTab): w.save_via(self.saver)
+                elif hasattr(w, "save"):
+                    if autosave and not getattr(w, "is_modified", lambda: True)(): continue
                     try: w.save()
-                    except Exception: pass
-                elif isinstance(w, CodeEditor) and getattr(w, "file_path", None):
-                    try:
-                        w.file_path.write_text(w.toPlainText(), encoding="utf-8")
-                        w.document().setModified(False)
-                    except Exception: pass
+                    except Exception as e: self.status.showMessage(f"Save failed: {e}", 5000)
+                elif (isinstance(w, CodeEditor) and getattr(w, "file_path", None) and w.document().isModified()
+                      and self._savable(w)):
+                    if (autosave and self.saver.is_busy(w)) or w.document() in docs: continue
+                    editors.append(w); docs.add(w.document())
+        self.saver.save(editors)
+
+    def _tab_of(self, w):
+        for tabs in (self.left_tabs, self.right_tabs):
+            i = tabs.indexOf(w)
+            if i >= 0: return tabs, i
+        return None, -1
+
+    def _on_saved(self, w, path):
+        self.search_dock.file_changed(path)
+        if isinstance(w, HibernatedTab): w.mark_saved(); self._update_tab_dirty(w, False)
+        for v in self._views_of(w):
+            if getattr(v, "save_error", None):
+                v.save_error = None
+                tabs, i = self._tab_of(v)
+                if tabs: tabs.setTabIcon(i, QIcon()); tabs.setTabToolTip(i, str(path))
+        self.status.showMessage(f"Saved {path}", 3000)
+
+    @staticmethod
+    def _views_of(w):
+        if isinstance(w, CodeEditor): return w.buffer.views
+        try: w.objectName(); return [w]
+        except RuntimeError: return []   # a hibernated tab that woke up or was closed meanwhile
+
+    def _on_save_failed(self, w, path, err):
+        """Flag the tabs of the file (icon + tooltip) until the next successful save."""
+        for v in self._views_of(w):
+            v.save_error = err
+            tabs, i = self._tab_of(v)
+            if tabs:
+                tabs.setTabIcon(i, self.style().standardIcon(QStyle.SP_MessageBoxWarning))
+                tabs.setTabToolTip(i, f"Save failed: {err}")
+        self.status.showMessage(f"Could not save {path}: {err}", 8000)
 
     def open_workspace_dialog(self):
         d = QFileDialog.getExistingDirectory(self, "Open Workspace", str(self.workspace_dir))
@@ -753,6 +1205,7 @@ class MainWindow(QMainWindow):
         self.workspace_dir = Path(path)
         self.settings.setValue("workspace_dir", str(self.workspace_dir))
         self.fs_model.setRootPath(str(self.workspace_dir))
+        self.path_index.set_root(self.workspace_dir)
         self.explorer.setRootIndex(self.fs_model.index(str(self.workspace_dir)))
         self.setWindowTitle(f"{APP_NAME} — {self.workspace_dir}")
 
@@ -787,7 +1240,7 @@ class MainWindow(QMainWindow):
         w = self.current_widget()
         if not w: return
         path = str(getattr(w, "file_path", "untitled"))
-        if isinstance(w, CodeEditor):
+        if isinstance(w, (CodeEditor, LargeFileView)):
             self.status.showMessage(f"{path} — Ln {w.current_line()}, Col {w.current_column()}")
         else:
             self.status.showMessage(path)
@@ -805,10 +1258,16 @@ class MainWindow(QMainWindow):
         act = self.panel_actions.get('Explorer')
         if act: act.setChecked(checked)
 
-    def register_theme(self, name, theme_dict, source="plugin"):
+    def register_theme(self, name, theme_dict, source="plugin", plugin=None):
         self.themes[name] = theme_dict
         if source in ("plugin","manifest"):
-            self.plugin_themes.add(name)
+            self.note_contribution(plugin or True, "theme", name, theme_dict)
+        self._rebuild_theme_menu()
+
+    def register_themes(self, themes: dict, owners: dict):
+        """Register several themes ({name: colors}, {name: extension}) with a single theme menu rebuild."""
+        self.themes.update(themes)
+        for name, colors in themes.items(): self.note_contribution(owners.get(name, True), "theme", name, colors)
         self._rebuild_theme_menu()
 
     def _rebuild_theme_menu(self):
@@ -832,82 +1291,119 @@ class MainWindow(QMainWindow):
         pal.setColor(QPalette.Text, fg); pal.setColor(QPalette.Highlight, sel)
         QApplication.instance().setPalette(pal)
         self.explorer.setStyleSheet(f"QTreeView {{ background: {theme.get('sidebar_bg', theme.get('background','#111'))}; color: {fg.name()}; }}")
-        for tabs in (self.left_tabs, self.right_tabs):
-            for i in range(tabs.count()):
-                w = tabs.widget(i)
-                if isinstance(w, CodeEditor):
-                    w.apply_theme(theme)
+        CodeEditor.theme = theme
+        # visible editors re-color now, hidden ones one per event-loop turn (or when shown)
+        editors = [tabs.widget(i) for tabs in (self.left_tabs, self.right_tabs) for i in range(tabs.count())]
+        editors = sorted((w for w in editors if isinstance(w, CodeEditor)), key=lambda w: not w.isVisible())
+        for w in editors: w.apply_theme(theme, defer=True)
+        self._recolor_queue = [w for w in editors if w.recolor_pending]
+        if self._recolor_queue: self._recolor_timer.start()
         self._rebuild_theme_menu()
         self.settings.setValue("pref_theme", name)
 
 
-    def _clear_plugin_contributions(self):
-        # remove plugin docks
-        for d in list(self.plugin_docks):
+    def _recolor_next(self):
+        """One time-boxed slice of re-coloring hidden editors per event-loop turn."""
+        if self._recolor_queue:
+            w = self._recolor_queue[0]
             try:
-                self.removeDockWidget(d)
-            except Exception:
-                pass
-        self.plugin_docks.clear()
-        # remove panel actions for removed docks (keep core ones)
-        for title, act in list(self.panel_actions.items()):
-            if title not in ("Explorer","Terminal","Search") and title in self.docks:
-                try:
-                    self.menu_panels.removeAction(act)
-                except Exception:
-                    pass
-                self.panel_actions.pop(title, None)
-                self.docks.pop(title, None)
-        # remove plugin menu actions
-        for menu, act in self.plugin_menu_actions:
+                done = not w.recolor_pending or w.recolor(budget=0.008)
+            except RuntimeError:   # tab closed meanwhile
+                done = True
+            if done: self._recolor_queue.pop(0)
+            return
+        self._recolor_timer.stop()
+
+    def note_contribution(self, plugin, kind, *data):
+        """Remember that extension `plugin` (True: some extension) registered something."""
+        if not plugin: return
+        items = self.contributions.setdefault(plugin, [])
+        if (kind, *data) not in items: items.append((kind, *data))
+
+    def remove_contributions(self, plugin):
+        """Take back what one extension registered: docks, menus, commands, handlers, themes,
+        grammars and status widgets. Anything since re-registered by someone else stays."""
+        grammars = False
+        for kind, *data in self.contributions.pop(plugin, []):
             try:
-                menu.removeAction(act)
-            except Exception:
-                pass
-        self.plugin_menu_actions.clear()
-        # remove plugin commands
-        for name in self.plugin_commands:
-            cb, act = self.commands.get(name, (None, None))
-            if act:
-                try: self.removeAction(act)
-                except Exception: pass
-            self.commands.pop(name, None)
-        self.plugin_commands.clear()
-        # reset file handlers (they're plugin-supplied)
-        self.file_handlers = {}
-        self.plugin_file_handlers.clear()
-        # remove plugin themes
-        for t in list(self.plugin_themes):
-            if t in self.themes:
-                self.themes.pop(t, None)
-        self.plugin_themes.clear()
+                if kind == "dock":
+                    title, dock = data
+                    try: dock.visibilityChanged.disconnect()   # being hidden here is not the user's choice
+                    except TypeError: pass
+                    self.removeDockWidget(dock); dock.deleteLater()
+                    if self.docks.get(title) is dock:
+                        self.docks.pop(title, None)
+                        act = self.panel_actions.pop(title, None)
+                        if act: self.menu_panels.removeAction(act)
+                elif kind == "panel":
+                    title, act = data
+                    if self.panel_actions.get(title) is act and title not in self.docks:
+                        self.panel_actions.pop(title); self.menu_panels.removeAction(act)
+                elif kind == "menu":
+                    menu, act = data
+                    menu.removeAction(act)
+                elif kind == "command":
+                    name, cb = data
+                    old_cb, act = self.commands.get(name, (None, None))
+                    if old_cb is cb:
+                        if act: self.removeAction(act)
+                        self.commands.pop(name, None)
+                elif kind == "handler":
+                    suffix, factory = data
+                    lst = self.file_handlers.get(suffix, [])
+                    lst[:] = [(n, f) for n, f in lst if f is not factory]
+                    if not lst: self.file_handlers.pop(suffix, None)
+                elif kind == "theme":
+                    name, theme = data
+                    if self.themes.get(name) is theme: self.themes.pop(name)
+                elif kind == "grammar":
+                    grammars = True
+                elif kind == "status":
+                    self.status.removeWidget(data[0]); data[0].deleteLater()
+            except RuntimeError:
+                pass   # already deleted with its parent
+        if grammars:
+            # back to the built-in grammars plus those of the other extensions
+            reset_grammars()
+            for items in self.contributions.values():
+                for kind, *data in items:
+                    if kind == "grammar": register_grammar(data[1])
+            for ed in self.open_editors().values(): ed.set_language(ed.file_path)
         self._rebuild_theme_menu()
-        # remove plugin status widgets
-        for w in self.plugin_status_widgets:
-            try:
-                self.status.removeWidget(w)
-            except Exception:
-                pass
-        self.plugin_status_widgets.clear()
+
+    def _clear_plugin_contributions(self):
+        for plugin in list(self.contributions):
+            self.remove_contributions(plugin)
+
     def reload_extensions(self):
         ext_path = Path(__file__).resolve().parent.parent / "extensions"
         disabled = self.settings.value("disabled_extensions", [], type=list)
         # clear previous plugin UI to avoid duplicates
+        self.plugin_manager.unload_all()
         self._clear_plugin_contributions()
         count, names = self.plugin_manager.load_plugins(str(ext_path), disabled=disabled)
-        self.status.showMessage(f"Loaded {count} extension(s)", 3000)
+        lazy = len(self.plugin_manager.pending)
+        self.status.showMessage(f"Loaded {count} extension(s)" + (f", {lazy} on demand" if lazy else ""), 3000)
 
     def open_settings(self):
         dlg = SettingsDialog(self, self.themes)
         current = {"theme": self.current_theme or "", "font_size": int(self.settings.value("font_size", 11)),
                    "tab_spaces": int(self.settings.value("tab_spaces", 4)), "autosave": int(self.settings.value("autosave", 0)),
-                   "workspace": str(self.settings.value("workspace_dir", str(self.workspace_dir)))}
+                   "save_fsync": self.settings.value("save_fsync", False, type=bool),
+                   "tab_budget_mb": int(self.settings.value("tab_budget_mb", 256)),
+                   "workspace": str(self.settings.value("workspace_dir", str(self.workspace_dir))),
+                   "search_max_hits": int(self.settings.value("search_max_hits", 10000)),
+                   "search_max_file_kb": int(self.settings.value("search_max_file_kb", 2048))}
         dlg.set_values(current)
         if dlg.exec_() == QDialog.Accepted:
             vals = dlg.get_values()
             self.settings.setValue("font_size", vals["font_size"])
             self.settings.setValue("tab_spaces", vals["tab_spaces"])
             self.settings.setValue("autosave", vals["autosave"])
+            self.settings.setValue("save_fsync", vals["save_fsync"]); self.saver.fsync = vals["save_fsync"]
+            self.settings.setValue("tab_budget_mb", vals["tab_budget_mb"]); self.hibernator.budget = vals["tab_budget_mb"] * 1024 * 1024
+            self.settings.setValue("search_max_hits", vals["search_max_hits"])
+            self.settings.setValue("search_max_file_kb", vals["search_max_file_kb"])
             if vals["workspace"]:
                 self.set_workspace(Path(vals["workspace"]))
             if vals["theme"] in self.themes:
@@ -924,20 +1420,25 @@ class MainWindow(QMainWindow):
             else: self._autosave_timer.stop()
 
     def open_extension_manager(self):
-        ExtensionManager(self).exec_()
+        dlg = ExtensionManager(self); dlg.exec_(); dlg.deleteLater()
 
     def run_current_file(self):
         w = self.current_widget()
         path = getattr(w, "file_path", None)
         if not path or str(path).lower().endswith(".py") is False:
             QMessageBox.information(self, "Run", "Open a .py file to run (F5)."); return
-        if isinstance(w, CodeEditor) and w.document().isModified():
-            self.save_current()
         cmd = f'python "{path}"'
-        self.terminal.run_command(cmd + "\n")
-        self.status.showMessage(f"Running: {cmd}", 3000)
+        def run(ok=True):
+            if not ok: return
+            self.terminal.run_command(cmd + "\n")
+            self.status.showMessage(f"Running: {cmd}", 3000)
+        if isinstance(w, CodeEditor) and w.document().isModified(): self.saver.save([w], then=run)
+        else: run()
 
-    def find_dialog(self): self._focus_search()
+    def find_dialog(self):
+        w = self.current_widget()
+        if isinstance(w, LargeFileView): w.q.setFocus(); w.q.selectAll(); return
+        self._focus_search()
 
     def replace_dialog(self):
         w = self.current_widget()
@@ -951,35 +1452,100 @@ class MainWindow(QMainWindow):
 
     def goto_line_dialog(self):
         w = self.current_widget()
-        if isinstance(w, CodeEditor):
+        if isinstance(w, (CodeEditor, LargeFileView)):
             ln, ok = QInputDialog.getInt(self, "Go to Line", "Line number:", value=w.current_line(), min=1)
             if ok: w.goto_line(ln)
 
+    def _startup_session(self):
+        with phase("session restore"): self._restore_session()
+        startup_profile.record("total")
+        startup_profile.finish(self)
+
     def _restore_session(self):
         raw = self.settings.value("session_files", "[]")
         try: files = json.loads(raw)
         except Exception: files = []
-        for entry in files:
-            try:
-                p = Path(entry.get("path", "")); pane = entry.get("pane", "left")
-                if p.exists(): self.open_file(p, pane=pane)
-            except Exception: pass
+        try: layout = json.loads(self.settings.value("session_layout", "{}"))
+        except Exception: layout = {}
+        recovered = self._recover_buffers({e.get("path"): e.get("pane", "left") for e in files if isinstance(e, dict)})
+        # text files come back as sleeping placeholders; only the current tab of each pane is read now
+        panes = (self.left_tabs, self.right_tabs)
+        for t in panes: t.blockSignals(True)
+        try:
+            for entry in files:
+                try:
+                    p = Path(entry.get("path", "")); pane = entry.get("pane", "left")
+                    if not p.exists() or str(p) in recovered or self.buffers.get(p) or path_key(p) in self._loading: continue
+                    tabs = self.right_tabs if pane == "right" else self.left_tabs
+                    if self._handler_for_suffix(p.suffix.lower()) or os.path.getsize(p) > LARGE_FILE_BYTES:
+                        self.open_file(p, pane=pane); continue
+                    if tabs is self.right_tabs: self.ensure_right_split_visible()
+                    h = self.hibernator.placeholder(p, entry.get("state") or {})
+                    tabs.addTab(h, p.name)
+                    if entry.get("current"): tabs.setCurrentWidget(h)
+                except Exception: pass
+        finally:
+            for t in panes: t.blockSignals(False)
+        if layout.get("splitter"): self.splitter.restoreState(QByteArray.fromHex(layout["splitter"].encode()))
+        for t in panes: self.hibernator.activate(t.currentWidget())
+        self._update_status()
+
+    def _recover_buffers(self, panes: dict) -> set:
+        """Offer the unsaved buffers journaled by a crashed session; returns the recovered paths."""
+        orphans = self.recovery.orphans()
+        swaps = [s for _, _, lst in orphans for s in lst]
+        done = set()
+        if swaps and QMessageBox.question(
+                self, "Recover Unsaved Changes",
+                f"{APP_NAME} did not shut down cleanly.\nRecover {len(swaps)} unsaved buffer(s)?") == QMessageBox.Yes:
+            errors = []
+            for swap in swaps:
+                try: path, enc, text = replay(swap)
+                except Exception as e: errors.append(str(e)); continue
+                ed = CodeEditor(self); ed.file_path = Path(path) if path else None; ed.encoding = enc
+                ed.set_language(ed.file_path)
+                # the tab (and its journal) is added once the text is in, so loading is not journaled
+                ed.load_text(text, done=lambda ed=ed, pane=panes.get(path, "left"): self._add_recovered(ed, pane))
+                if path: done.add(path)
+            if errors: QMessageBox.warning(self, "Recover Unsaved Changes", "Some buffers could not be recovered:\n" + "\n".join(errors))
+        for o in orphans: self.recovery.discard(o)
+        return done
+
+    def _add_recovered(self, ed, pane):
+        ed.document().setModified(True)
+        if ed.file_path: self.buffers.register(ed.buffer)
+        self.add_tab(ed, ed.file_path.name if ed.file_path else "untitled", pane=pane)
+        self._editor_loaded(ed)
 
     def closeEvent(self, e):
+        self.search_dock.cancel_search()
         lst = []
         for pane, tabs in (("left", self.left_tabs), ("right", self.right_tabs)):
             for i in range(tabs.count()):
                 w = tabs.widget(i); p = getattr(w, "file_path", None)
-                if p: lst.append({"path": str(p), "pane": pane})
+                if not p: continue
+                entry = {"path": str(p), "pane": pane}
+                state = self.hibernator.view_state(w) if isinstance(w, CodeEditor) else getattr(w, "state", None)
+                if state: entry["state"] = {k: v for k, v in state.items() if k != "modified"}
+                if i == tabs.currentIndex(): entry["current"] = True
+                lst.append(entry)
         self.settings.setValue("session_files", json.dumps(lst))
+        self.settings.setValue("session_layout", json.dumps({"splitter": bytes(self.splitter.saveState().toHex()).decode()}))
+        self.saver.wait()
+        self.recovery.shutdown()
+        self.plugin_manager.installer.shutdown()
+        self.tasks.shutdown()
         return super().closeEvent(e)
 
 
 def run():
-    app = QApplication(sys.argv)
+    """Start the editor; with --profile-startup, time the startup phases and show a report."""
+    app = QApplication([a for a in sys.argv if a != startup_profile.FLAG])
     app.setOrganizationName(ORG); app.setOrganizationDomain(DOMAIN); app.setApplicationName(APP_NAME)
     font = QFont("Fira Code, Consolas, Monospace"); font.setStyleHint(QFont.Monospace); app.setFont(font)
-    w = MainWindow(); w.show()
+    with phase("MainWindow"): w = MainWindow()
+    with phase("show"): w.show()
+    startup_profile.record_when_idle("first event loop pass")
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
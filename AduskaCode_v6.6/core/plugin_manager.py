@@ -1,104 +1,282 @@
 
-import importlib.util, json, sys, subprocess, zipfile, tempfile, traceback
+import importlib.util, traceback
+from functools import partial
 from pathlib import Path
+from PyQt5.QtCore import QStandardPaths
+from PyQt5.QtWidgets import QAction
+from core.startup_profile import phase
+from core.extension_cache import ExtensionCache, is_theme_only
+from core.editor_api import EditorAPI
+from core.plugin_stats import PluginStats
+from core.dependencies import RequirementInstaller, missing_requirements
 
 class PluginManager:
+    """Loads .extend plugins (folders or zip archives with manifest.json + main.py).
+
+    A manifest may list `activationEvents`; such a plugin is not imported at startup. Stand-ins
+    for what it contributes are registered from the manifest instead, and the first use of one
+    loads the plugin and hands over to the real contribution:
+
+        onOpen:<suffix>    a file handler named after the plugin
+        onCommand:<name>   a palette command
+        onMenu:<path>      a menu item, e.g. "Tools/Image/Convert…"
+        onDock:<title>     a Panels entry; loads at startup if the dock was left open
+        *                  load at startup (also the default without activationEvents)
+
+    A `"type": "theme"` manifest with a `theme` dict and no activationEvents is a theme-only
+    extension: its colors are registered from the manifest and main.py is never run.
+    """
     def __init__(self, main_window):
         self.main_window = main_window
+        self.cache = ExtensionCache(Path(QStandardPaths.writableLocation(QStandardPaths.CacheLocation)) / "extensions")
+        self.pending = {}    # extension file name -> loader, until activated
+        self.loaded = set()
+        self._stubs = {}     # extension file name -> [(kind, key, stand-in)]
+        self.modules = {}    # extension file name -> (module, its EditorAPI)
+        self.extensions_dir = None
+        self.installer = RequirementInstaller(main_window)
+        self.stats = PluginStats()
 
     def load_plugins(self, extensions_dir: str, disabled=None):
         count = 0
         disabled = set(disabled or [])
+        self.unload_all()
+        self.extensions_dir = Path(extensions_dir)
         p = Path(extensions_dir)
         if not p.exists():
             return 0, []
         loaded_names = []
-        for child in sorted(p.iterdir()):
-            if child.name in disabled:
+        children = [c for c in sorted(p.iterdir()) if c.name not in disabled and self._is_extension(c)]
+        # theme-only extensions come from one cached table; no archive is opened, no code runs
+        with phase("themes"):
+            themes, owners = {}, {}
+            for ext_name, (name, colors) in self.cache.themes(children).items():
+                if name in disabled: continue
+                themes[name] = colors; owners[name] = ext_name; count += 1
+                loaded_names.append(ext_name); self.loaded.add(ext_name)
+            if themes: self.main_window.register_themes(themes, owners)
+        for child in children:
+            if child.name in self.loaded:
                 continue
-            if child.is_dir() and child.name.endswith(".extend"):
-                loaded = self._load_from_directory(child, disabled)
-            elif child.is_file() and child.suffix == ".extend":
-                loaded = self._load_from_zip(child, disabled)
-            else:
-                loaded = 0
+            loaded = self.load_extension(child, disabled)
             count += loaded
             if loaded:
                 loaded_names.append(child.name)
+        self.cache.save()
         return count, loaded_names
 
+    @staticmethod
+    def _is_extension(child: Path):
+        return (child.is_dir() and child.name.endswith(".extend")) or (child.is_file() and child.suffix == ".extend")
+
+    def load_extension(self, child: Path, disabled=()):
+        """Load one extension, or register its stand-ins if it loads on demand; 1 if it is loaded now."""
+        manifest = self._manifest(child)
+        if manifest is not None and manifest.get("name", child.stem) in disabled:
+            return 0
+        if manifest is not None and is_theme_only(manifest):
+            self.main_window.register_theme(manifest.get("name", child.stem), manifest["theme"], source="manifest", plugin=child.name)
+            self.loaded.add(child.name); return 1
+        load = partial(self._load_from_directory if child.is_dir() else self._load_from_zip, child, disabled)
+        events = (manifest or {}).get("activationEvents") or ["*"]
+        if not self._wanted_now(events):
+            self.pending[child.name] = load
+            self._register_stubs(child.name, manifest, events)
+            return 0
+        with phase(child.name): loaded = load()
+        if loaded: self.loaded.add(child.name)
+        return loaded
+
+    def unload(self, ext_name):
+        """Take one extension out: its on_unload(api) runs, then what it registered is removed."""
+        mod, api = self.modules.pop(ext_name, (None, None))
+        if mod is not None and hasattr(mod, "on_unload"):
+            try: mod.on_unload(api)
+            except Exception as e:
+                print("[EXT] on_unload failed:", e); traceback.print_exc()
+        self.pending.pop(ext_name, None); self._stubs.pop(ext_name, None); self.loaded.discard(ext_name)
+        self.installer.cancel(ext_name)
+        self.main_window.tasks.cancel_owner(ext_name)
+        self.main_window.remove_contributions(ext_name)
+
+    def unload_all(self):
+        for ext_name in self.loaded | set(self.pending) | set(self.modules):
+            self.unload(ext_name)
+
+    def reload(self, ext_name, disabled=()):
+        """Unload one extension and load it again from disk (unless it is gone or disabled); 1 if it is loaded."""
+        self.unload(ext_name)
+        child = self.extensions_dir / ext_name
+        if ext_name in disabled or not self._is_extension(child): return 0
+        loaded = self.load_extension(child, set(disabled))
+        self.cache.save()
+        return loaded
+
+    def _manifest(self, child: Path):
+        try:
+            return self.cache.manifest(child / "manifest.json") if child.is_dir() else self.cache.archive(child)["manifest"]
+        except Exception:
+            return None   # reported when the plugin is loaded
+
+    def _wanted_now(self, events):
+        settings = self.main_window.settings
+        return any(ev == "*" or (ev.startswith("onDock:") and settings.value(f"panel_visible/{ev[7:]}", True, type=bool))
+                   for ev in events)
+
+    def activate(self, ext_name) -> bool:
+        """Load a deferred plugin now; True if it is loaded (or already was)."""
+        load = self.pending.pop(ext_name, None)
+        if load is None: return ext_name in self.loaded
+        with phase(ext_name): loaded = load()
+        if loaded: self.loaded.add(ext_name)
+        elif self.installer.pending(ext_name):
+            self.pending[ext_name] = load; return False   # stand-ins stay until the install is done
+        self._drop_stubs(ext_name)
+        return bool(loaded)
+
+    def _register_stubs(self, ext_name, manifest, events):
+        mw = self.main_window; name = manifest.get("name", ext_name)
+        stubs = self._stubs.setdefault(ext_name, [])
+        for ev in events:
+            kind, _, arg = ev.partition(":")
+            if kind == "onOpen":
+                f = partial(self._open_stub, ext_name, name)
+                mw.register_file_handler([arg], name, f, plugin=ext_name); stubs.append((kind, arg.lower(), f))
+            elif kind == "onCommand":
+                f = partial(self._command_stub, ext_name, arg)
+                mw.register_command(arg, f, plugin=ext_name); stubs.append((kind, arg, f))
+            elif kind == "onMenu":
+                stubs.append((kind, arg, mw.register_menu(arg, partial(self._menu_stub, ext_name, arg), plugin=ext_name)))
+            elif kind == "onDock":
+                act = QAction(arg, mw, checkable=True); f = partial(self._dock_stub, ext_name, arg)
+                act.toggled.connect(f)
+                mw.panel_actions[arg] = act; mw.menu_panels.addAction(act)
+                mw.note_contribution(ext_name, "panel", arg, act)
+                stubs.append((kind, arg, (act, f)))
+
+    def _drop_stubs(self, ext_name):
+        """Remove stand-ins the plugin did not replace with its own contributions."""
+        mw = self.main_window
+        for kind, key, stub in self._stubs.pop(ext_name, []):
+            if kind == "onOpen":
+                lst = mw.file_handlers.get(key, [])
+                lst[:] = [(n, f) for n, f in lst if f is not stub]
+            elif kind == "onCommand" and mw.commands.get(key, (None,))[0] is stub:
+                mw.commands.pop(key, None)
+            elif kind == "onMenu" and stub is not None:
+                for w in stub.associatedWidgets(): w.removeAction(stub)
+            elif kind == "onDock":
+                act, f = stub
+                try: act.toggled.disconnect(f)
+                except TypeError: pass
+                if key not in mw.docks:
+                    mw.menu_panels.removeAction(act); mw.panel_actions.pop(key, None)
+
+    def _open_stub(self, ext_name, name, path, api):
+        self.activate(ext_name)
+        items = self.main_window.file_handlers.get(Path(path).suffix.lower(), [])
+        items = [(n, f) for n, f in items if not (isinstance(f, partial) and f.func == self._open_stub)]
+        factory = next((f for n, f in items if n == name), None)
+        if factory is None and self.installer.pending(ext_name):
+            raise RuntimeError(f"{name} is installing its requirements; see the Extension Manager.")
+        if factory is None: raise RuntimeError(f"{name} did not load; see the console for details.")
+        return factory(path, api)
+
+    def _command_stub(self, ext_name, command, *_):
+        self.activate(ext_name)
+        cb = self.main_window.commands.get(command, (None,))[0]
+        if cb is not None and not (isinstance(cb, partial) and cb.func == self._command_stub): cb()
+
+    def _menu_stub(self, ext_name, path, *_):
+        self.activate(ext_name)
+        act = self._menu_action(path)
+        if act is not None: act.trigger()
+
+    def _menu_action(self, path):
+        parts = [p for p in path.split("/") if p]
+        menu = self.main_window.custom_menus.get(parts[0])
+        for p in parts[1:-1]:
+            if menu is None: return None
+            menu = next((a.menu() for a in menu.actions() if a.menu() and a.text() == p), None)
+        return next((a for a in menu.actions() if a.text() == parts[-1]), None) if menu else None
+
+    def _dock_stub(self, ext_name, title, checked):
+        if not checked: return
+        self.main_window.settings.setValue(f"panel_visible/{title}", True)
+        if not self.activate(ext_name):
+            act = self.main_window.panel_actions.get(title)
+            if act: act.setChecked(False)
+
     def _load_from_directory(self, folder: Path, disabled):
         mf = folder / "manifest.json"
         entry = folder / "main.py"
         if not (mf.exists() and entry.exists()):
             return 0
         try:
-            manifest = json.loads(mf.read_text(encoding="utf-8"))
+            manifest = self.cache.manifest(mf)
         except Exception as e:
             print("[EXT] manifest error:", e); return 0
         name = manifest.get("name", folder.name)
         if name in disabled: return 0
-        self._ensure_requires(manifest.get("requires", []), name)
-        return self._exec_plugin(entry, manifest)
+        with phase("requires"): ready = self._ensure_requires(folder.name, entry, manifest)
+        if not ready: return 0
+        with phase("_exec_plugin"): return self._exec_plugin(entry, manifest, folder.name)
 
     def _load_from_zip(self, file_path: Path, disabled):
         try:
-            with zipfile.ZipFile(file_path, "r") as z:
-                namelist = z.namelist()
-                manifest_name = next((n for n in namelist if n.endswith("manifest.json")), None)
-                entry_name = next((n for n in namelist if n.endswith("main.py")), None)
-                if not manifest_name or not entry_name:
-                    print(f"[EXT] {file_path.name}: missing manifest.json or main.py")
-                    return 0
-                manifest = json.loads(z.read(manifest_name).decode("utf-8"))
-                name = manifest.get("name", file_path.stem)
-                if name in disabled: return 0
-                tmp = Path(tempfile.mkdtemp(prefix="aduska_ext_"))
-                z.extractall(tmp)
-                entry = tmp / entry_name
+            info = self.cache.archive(file_path)
+        except ValueError as e:
+            print(f"[EXT] {file_path.name}: {e}"); return 0
+        except Exception as e:
+            print("[EXT] zip error:", e); return 0
+        manifest = info["manifest"]
+        if manifest.get("name", file_path.stem) in disabled: return 0
+        try:
+            with phase("extract"): entry = self.cache.unpack(file_path, info)
         except Exception as e:
             print("[EXT] zip error:", e); return 0
 
-        self._ensure_requires(manifest.get("requires", []), manifest.get("name", file_path.stem))
-        loaded = self._exec_plugin(entry, manifest)
+        with phase("requires"): ready = self._ensure_requires(file_path.name, entry, manifest)
+        if not ready: return 0
+        with phase("_exec_plugin"): loaded = self._exec_plugin(entry, manifest, file_path.name)
         return loaded
 
-    def _ensure_requires(self, requires, plugin_name="plugin"):
-        missing = []
-        # map common pip names -> import module names
-        name_map = {
-            "Markdown": "markdown",
-            "Pillow": "PIL",
-            "PyYAML": "yaml",
-            "yaml": "yaml",
-            "PyMuPDF": "fitz",
-            "fitz": "fitz",
-        }
-        for r in requires or []:
-            mod = name_map.get(r, r)
-            try:
-                __import__(mod)
-            except Exception:
-                missing.append(r)
-        if missing:
-            print(f"[EXT] Installing requirements for {plugin_name}: {missing}")
-            try:
-                subprocess.run([sys.executable, "-m", "pip", "install", *missing], check=False)
-            except Exception as e:
-                print("[EXT] pip failed:", e)
+    def _ensure_requires(self, ext_name, entry: Path, manifest: dict) -> bool:
+        """True if the plugin's requirements are installed; otherwise queue their install and
+        load the plugin once it succeeds."""
+        missing = missing_requirements(manifest.get("requires", []))
+        if not missing: return True
+        self.installer.install(ext_name, missing, partial(self._installed, ext_name, entry, manifest))
+        self.main_window.status.showMessage(f"Installing requirements for {manifest.get('name', ext_name)}…", 3000)
+        return False
+
+    def _installed(self, ext_name, entry, manifest, ok):
+        name = manifest.get("name", ext_name)
+        if ext_name in self.main_window.settings.value("disabled_extensions", [], type=list): return
+        if ext_name in self.loaded or not (self.extensions_dir / ext_name).exists(): return   # uninstalled meanwhile
+        loaded = ok and self._exec_plugin(entry, manifest, ext_name)
+        if loaded: self.loaded.add(ext_name)
+        self.pending.pop(ext_name, None); self._drop_stubs(ext_name)
+        self.main_window.status.showMessage(f"{name} is ready" if loaded else f"{name}: requirements could not be installed"
+                                            if not ok else f"{name} failed to load", 5000)
 
-    def _exec_plugin(self, entry_path: Path, manifest: dict) -> int:
+    def _exec_plugin(self, entry_path: Path, manifest: dict, ext_name=None) -> int:
+        ext_name = ext_name or entry_path.parent.name
+        api = EditorAPI(self.main_window, owner=ext_name)
+        self.stats.reset(ext_name)
         try:
             spec = importlib.util.spec_from_file_location(manifest.get("name", entry_path.stem), str(entry_path))
             mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)  # type: ignore
+            with phase("exec_module"), self.stats.measure(ext_name, "import"): spec.loader.exec_module(mod)  # type: ignore
             if hasattr(mod, "on_load"):
-                mod.on_load(self.main_window.api)
+                with phase("on_load"), self.stats.measure(ext_name, "on_load"): mod.on_load(api)
             th = manifest.get("theme")
             if isinstance(th, dict):
-                self.main_window.register_theme(manifest.get("name", entry_path.stem), th, source="manifest")
+                self.main_window.register_theme(manifest.get("name", entry_path.stem), th, source="manifest", plugin=ext_name)
+            self.modules[ext_name] = (mod, api)
             return 1
         except Exception as e:
             print("[EXT] load failed:", e)
             traceback.print_exc()
+            self.main_window.remove_contributions(ext_name)   # whatever on_load got to register
             return 0
@@ -0,0 +1,71 @@
+
+import os, time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    _PAGE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE = 4096
+
+
+def rss_bytes():
+    """Resident memory of this process, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+class PluginStats:
+    """Wall time and resident memory growth of each extension's code, by kind of call:
+    "import" (running main.py), "on_load", "open" (file handler factories) and "command"
+    (command and menu callbacks)."""
+    KINDS = ("import", "on_load", "open", "command")
+
+    def __init__(self):
+        self.data = {}    # extension -> {kind: [calls, total sec, max sec, memory growth bytes]}
+
+    @contextmanager
+    def measure(self, ext, kind):
+        mem0 = rss_bytes(); t0 = time.perf_counter()
+        try: yield
+        finally:
+            sec = time.perf_counter() - t0
+            mem1 = rss_bytes() if mem0 is not None else None
+            rec = self.data.setdefault(ext, {}).setdefault(kind, [0, 0.0, 0.0, 0])
+            rec[0] += 1; rec[1] += sec; rec[2] = max(rec[2], sec)
+            if mem1 is not None: rec[3] += max(0, mem1 - mem0)
+
+    def wrap(self, ext, kind, fn):
+        """`fn` measured on every call. Signal arguments (e.g. QAction's `checked`) are not passed on
+        unless `kind` is "open", whose factories take (path, api)."""
+        if kind == "open":
+            @wraps(fn)
+            def measured(*args, **kw):
+                with self.measure(ext, kind): return fn(*args, **kw)
+        else:
+            @wraps(fn)
+            def measured(*_):
+                with self.measure(ext, kind): return fn()
+        return measured
+
+    def reset(self, ext):
+        self.data.pop(ext, None)
+
+    def get(self, ext, kind):
+        """(calls, total sec, max sec, memory growth bytes) or None."""
+        rec = self.data.get(ext, {}).get(kind)
+        return tuple(rec) if rec else None
+
+    def worst_ms(self, ext) -> float:
+        """The longest single call into the extension, in ms (import and on_load count as one each)."""
+        return max((rec[2] for rec in self.data.get(ext, {}).values()), default=0.0) * 1000
+
+    def memory(self, ext) -> int:
+        return sum(rec[3] for rec in self.data.get(ext, {}).values())
@@ -0,0 +1,253 @@
+
+import re, time, heapq, threading
+from itertools import compress
+from array import array
+from pathlib import Path
+from PyQt5.QtCore import Qt, QObject, QTimer, QFileSystemWatcher, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel
+from core.search_filter import FileFilter
+
+SEPARATORS = "/_-. "
+
+
+class PathIndex(QObject):
+    """In-memory list of workspace files, rebuilt off-thread when a watched directory changes.
+
+    Paths are kept shortest-first, so a scan that runs out of time budget has already
+    seen the likeliest matches. `_by_char` maps a character to the indices of the paths
+    containing it, which seeds the first keystroke without touching every path.
+    """
+    ready = pyqtSignal()
+    _built = pyqtSignal(int, list, list, dict, list)   # generation, paths, lowercased, char map, dirs
+
+    MAX_WATCHED_DIRS = 8192
+    REBUILD_DELAY_MS = 400
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = ""
+        self.paths = []          # relative paths, "/" separated
+        self._lower = []
+        self._by_char = {}
+        self._gen = 0
+        self.building = False
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(lambda _: self._debounce.start())
+        self._debounce = QTimer(self); self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.REBUILD_DELAY_MS)
+        self._debounce.timeout.connect(self.rebuild)
+        self._built.connect(self._on_built)
+
+    def set_root(self, root):
+        root = str(root)
+        if root == self.root: return
+        self.root = root
+        self.paths = []; self._lower = []; self._by_char = {}
+        dirs = self._watcher.directories()
+        if dirs: self._watcher.removePaths(dirs)
+        self.rebuild()
+
+    def rebuild(self):
+        if not self.root: return
+        self._gen += 1
+        self.building = True
+        threading.Thread(target=self._build, args=(self._gen, self.root), name="aduska-paths", daemon=True).start()
+
+    def _build(self, gen, root):
+        dirs = []
+        flt = FileFilter(max_size=0, skip_binary=False)
+        paths = [rel for _, rel in flt.walk(root, on_dir=dirs.append)]
+        paths.sort(key=lambda p: (len(p), p))
+        lower = [p.lower() for p in paths]
+        by_char = {}
+        for i, pl in enumerate(lower):
+            for c in set(pl):
+                a = by_char.get(c)
+                if a is None: a = by_char[c] = array("I")
+                a.append(i)
+        try: self._built.emit(gen, paths, lower, by_char, dirs[:self.MAX_WATCHED_DIRS])
+        except RuntimeError: pass
+
+    def _on_built(self, gen, paths, lower, by_char, dirs):
+        if gen != self._gen: return
+        self.building = False
+        self.paths, self._lower, self._by_char = paths, lower, by_char
+        old = set(self._watcher.directories()); new = set(dirs)
+        if old - new: self._watcher.removePaths(list(old - new))
+        if new - old: self._watcher.addPaths(list(new - old))
+        self.ready.emit()
+
+    def seed(self, query: str):
+        """Indices of paths containing the rarest character of `query` (a superset of the matches)."""
+        seeds = [self._by_char.get(c, ()) for c in set(query.lower())]
+        return min(seeds, key=len) if seeds else range(len(self.paths))
+
+    def subsequence_matches(self, query: str, within):
+        """Indices from `within` whose path contains `query` as a (case-insensitive) subsequence."""
+        # "[^c]*c" per character: greedy, no backtracking, linear in the path length
+        match = re.compile("".join("[^%s]*%s" % (re.escape(c), re.escape(c)) for c in query.lower())).match
+        # map/compress keep the per-path loop in C
+        return list(compress(within, map(match, map(self._lower.__getitem__, within))))
+
+
+def fuzzy_score(path: str, q: str):
+    """Score a subsequence match of lowercased `q` in `path`; None if it does not match."""
+    pl = path.lower()
+    base = pl.rfind("/") + 1
+    # prefer a match entirely inside the file name, fall back to the whole path
+    for start, bonus in ((base, 12), (0, 0)):
+        pos = start; prev = -2; score = bonus
+        for ch in q:
+            i = pl.find(ch, pos)
+            if i < 0: score = None; break
+            s = 1
+            if i == prev + 1: s += 5
+            if i == 0 or pl[i - 1] in SEPARATORS: s += 4
+            elif path[i].isupper() and path[i - 1].islower(): s += 3
+            score += s; prev = i; pos = i + 1
+        if score is not None:
+            return score - len(path) * 0.05
+    return None
+
+
+class FuzzyFinder:
+    """Ranks PathIndex entries for a query in time-boxed slices.
+
+    `start` + one `step` fit in a keystroke; further `step`s refine the ranking from an
+    idle timer. A fully scanned query's matches seed the next, longer query.
+    """
+    BUDGET_SEC = 0.010
+    CHUNK = 512
+
+    def __init__(self, index: PathIndex, limit=50):
+        self.index = index
+        self.limit = limit
+        self._prev_q = None; self._prev_matches = None
+        self.q = ""; self.done = True
+        self._heap = []; self._source = (); self._pos = 0; self._matches = []; self._rank = {}
+
+    def reset(self):
+        self._prev_q = None; self._prev_matches = None
+
+    def start(self, query: str, recent=()):
+        q = self.q = "".join(query.lower().split())
+        self._rank = rank = {p: len(recent) - i for i, p in enumerate(recent)}
+        self._heap = []; self._pos = 0; self._matches = []
+        if not q:
+            self.done = True
+            return
+        if self._prev_q and q.startswith(self._prev_q) and self._prev_matches is not None:
+            self._source = self._prev_matches
+        else:
+            self._source = self.index.seed(q)
+        self._prev_q = q; self._prev_matches = None
+        self.done = False
+        # recently used files are always ranked, and ranked higher
+        heap = []
+        for p in recent:
+            s = fuzzy_score(p, q)
+            if s is not None: heap.append((s + rank[p] * 2, -len(p), p))
+        self._heap = heapq.nlargest(self.limit, heap); heapq.heapify(self._heap)
+
+    def step(self, budget=None):
+        """Scan further for up to `budget` seconds; returns True when the query is fully ranked."""
+        if self.done: return True
+        t0 = time.perf_counter(); budget = budget or self.BUDGET_SEC
+        q, paths, rank, heap, limit = self.q, self.index.paths, self._rank, self._heap, self.limit
+        src = self._source
+        while self._pos < len(src):
+            chunk = src[self._pos:self._pos + self.CHUNK]
+            self._pos += len(chunk)
+            ok = self.index.subsequence_matches(q, chunk)
+            self._matches.extend(ok)
+            for i in ok:
+                p = paths[i]
+                if p in rank: continue
+                item = (fuzzy_score(p, q), -len(p), p)
+                if len(heap) < limit: heapq.heappush(heap, item)
+                elif item > heap[0]: heapq.heapreplace(heap, item)
+            if time.perf_counter() - t0 > budget: return False
+        self.done = True
+        self._prev_matches = self._matches
+        return True
+
+    def results(self):
+        if not self.q:
+            out = [p for p in sorted(self._rank, key=self._rank.get, reverse=True)][:self.limit]
+            seen = set(out)
+            for p in self.index.paths:
+                if len(out) >= self.limit: break
+                if p not in seen: out.append(p)
+            return out
+        return [p for _, _, p in sorted(self._heap, reverse=True)]
+
+    def find(self, query: str, recent=()):
+        """Synchronous ranking of the whole index (no time budget)."""
+        self.start(query, recent)
+        while not self.step(budget=3600): pass
+        return self.results()
+
+
+class QuickOpenDialog(QDialog):
+    def __init__(self, main, index: PathIndex, recent):
+        super().__init__(main)
+        self.main = main
+        self.index = index
+        self.recent = list(recent)
+        self.finder = FuzzyFinder(index)
+        self.setWindowTitle("Quick Open")
+        self.resize(640, 420)
+        lay = QVBoxLayout(self); lay.setContentsMargins(6, 6, 6, 6)
+        self.q = QLineEdit(); self.q.setPlaceholderText("Type to search files by name…")
+        self.list = QListWidget()
+        self.info = QLabel("")
+        lay.addWidget(self.q); lay.addWidget(self.list); lay.addWidget(self.info)
+        self.q.textChanged.connect(self._update)
+        self.q.returnPressed.connect(self._accept_current)
+        self.list.itemActivated.connect(lambda _: self._accept_current())
+        self.q.installEventFilter(self)
+        # keeps refining the ranking between keystrokes while the finder has work left
+        self._timer = QTimer(self); self._timer.setInterval(0); self._timer.timeout.connect(self._refine)
+        self._t0 = time.perf_counter()
+        index.ready.connect(self._on_index_ready)
+        self._update()
+
+    def _on_index_ready(self):
+        self.finder.reset(); self._update()
+
+    def eventFilter(self, obj, e):
+        # arrow keys in the query line move the selection in the list
+        if obj is self.q and e.type() == e.KeyPress and e.key() in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+            self.list.keyPressEvent(e); return True
+        return super().eventFilter(obj, e)
+
+    def _update(self):
+        self._t0 = time.perf_counter()
+        self.finder.start(self.q.text(), self.recent)
+        self._refine(keep=False)
+
+    def _refine(self, keep=True):
+        done = self.finder.step()
+        res = self.finder.results()
+        # a refine tick re-ranks the same query: stay on the row the user moved to
+        cur = self.list.currentItem()
+        cur = cur.data(Qt.UserRole) if keep and cur is not None else None
+        self.list.setUpdatesEnabled(False)
+        self.list.clear()
+        for p in res:
+            it = QListWidgetItem(f"{p.rsplit('/', 1)[-1]}    {p}")
+            it.setData(Qt.UserRole, p)
+            self.list.addItem(it)
+        if res: self.list.setCurrentRow(res.index(cur) if cur in res else 0)
+        self.list.setUpdatesEnabled(True)
+        if done: self._timer.stop()
+        elif not self._timer.isActive(): self._timer.start()
+        ms = (time.perf_counter() - self._t0) * 1000
+        state = "indexing… " if self.index.building else "" if done else "ranking… "
+        self.info.setText(f"{state}{len(self.index.paths)} files · {ms:.1f} ms")
+
+    def _accept_current(self):
+        it = self.list.currentItem()
+        if not it: return
+        self.accept()
+        self.main.open_file(Path(self.index.root) / it.data(Qt.UserRole))
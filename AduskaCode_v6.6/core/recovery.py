@@ -0,0 +1,195 @@
+
+import os, json, uuid, shutil, zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PyQt5.QtCore import QObject, QTimer, QLockFile
+from PyQt5.QtGui import QTextDocument, QTextCursor
+from core.fileio import atomic_write_text
+from core.file_loader import decode
+
+_pool = None
+
+
+def swap_writer():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aduska-swap")
+    return _pool
+
+
+def _create(swap, header, base_path):
+    if base_path is not None:
+        st = os.stat(base_path)
+        header["base"] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    with open(swap, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+
+
+def _append(swap, lines):
+    with open(swap, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+
+def _delete(swap):
+    try: os.unlink(swap)
+    except OSError: pass
+
+
+def best_effort(fn, *args):
+    try: fn(*args)
+    except OSError: pass   # recovery is best effort; never take the editor down
+
+
+class SwapJournal(QObject):
+    """Journals one buffer's edits to a swap file.
+
+    The journal starts at the first edit of a clean document, so its base is the file on disk
+    (recorded by mtime and size) and nothing but the edits is written. Each contentsChange is
+    appended as [position, removed, inserted text] (positions in document units) by the swap
+    writer thread, batched every FLUSH_MS. Once the journal outgrows the document it is
+    compacted into a text snapshot. The swap is dropped when the document becomes clean again.
+    """
+    FLUSH_MS = 1000
+    COMPACT_MIN = 256 * 1024
+
+    def __init__(self, buffer, directory: Path, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.doc = buffer.document
+        self.dir = directory
+        self.swap = None
+        self._ops = []
+        self._bytes = 0
+        self._timer = QTimer(self); self._timer.setSingleShot(True); self._timer.timeout.connect(self.flush)
+        self.doc.contentsChange.connect(self._changed)
+        self.doc.modificationChanged.connect(self._modified)
+        if self.doc.isModified() or (buffer.file_path is None and not self.doc.isEmpty()):
+            self._start(snapshot=True)
+
+    def _start(self, snapshot=False):
+        self.swap = str(self.dir / f"{uuid.uuid4().hex}.swap")
+        path = self.buffer.file_path
+        header = {"v": 1, "path": str(path) if path else None, "encoding": self.buffer.encoding}
+        if snapshot or path is None: header["text"] = self.doc.toPlainText() if snapshot else ""
+        self._bytes = 0
+        swap_writer().submit(best_effort, _create, self.swap, header, None if "text" in header else str(path))
+
+    def _changed(self, pos, removed, added):
+        if self.swap is None: self._start()
+        end = self.doc.characterCount() - 1   # Qt may count the final paragraph separator
+        if pos + added > end:
+            extra = pos + added - end; added -= extra; removed = max(0, removed - extra)
+        text = ""
+        if added > 0:
+            cur = QTextCursor(self.doc); cur.setPosition(pos); cur.setPosition(pos + added, QTextCursor.KeepAnchor)
+            text = cur.selectedText().replace("\u2029", "\n")
+        if removed or text:
+            self._ops.append(json.dumps([pos, removed, text]))
+            if not self._timer.isActive(): self._timer.start(self.FLUSH_MS)
+
+    def _modified(self, dirty):
+        # an untitled buffer has no file to fall back to, so its journal stays
+        if not dirty and self.buffer.file_path is not None: self.drop()
+
+    def flush(self):
+        if not self._ops or self.swap is None: return
+        lines = "\n".join(self._ops) + "\n"; self._ops = []
+        self._bytes += len(lines)
+        if self._bytes > max(self.COMPACT_MIN, self.doc.characterCount()):
+            path = self.buffer.file_path
+            header = {"v": 1, "path": str(path) if path else None, "encoding": self.buffer.encoding,
+                      "text": self.doc.toPlainText()}
+            self._bytes = 0
+            swap_writer().submit(best_effort, atomic_write_text, self.swap, json.dumps(header) + "\n")
+        else:
+            swap_writer().submit(best_effort, _append, self.swap, lines)
+
+    def drop(self):
+        """Forget the journal (the document is clean, or its tab is gone)."""
+        self._timer.stop(); self._ops = []
+        if self.swap: swap_writer().submit(_delete, self.swap)
+        self.swap = None
+
+
+def replay(swap):
+    """(path or None, encoding, recovered text) from a swap file; ValueError if its base file changed.
+
+    `.swapz` files are zlib-compressed swaps (snapshots of hibernated tabs).
+    """
+    with open(swap, "rb") as f: data = f.read()
+    if swap.endswith(".swapz"): data = zlib.decompress(data)
+    lines = data.decode("utf-8").split("\n")
+    header = json.loads(lines[0])
+    ops = [json.loads(line) for line in lines[1:] if line.strip()]
+    path, enc = header.get("path"), header.get("encoding", "utf-8")
+    if "text" in header:
+        text = header["text"]
+    else:
+        st = os.stat(path); base = header["base"]
+        if (st.st_mtime_ns, st.st_size) != (base["mtime_ns"], base["size"]):
+            raise ValueError(f"{path} changed on disk since the unsaved edits were made")
+        with open(path, "rb") as f: text, _ = decode(f.read(), force=True)
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if ops:
+        doc = QTextDocument(); doc.setUndoRedoEnabled(False); doc.setPlainText(text)
+        cur = QTextCursor(doc)
+        for pos, removed, ins in ops:
+            cur.setPosition(pos); cur.setPosition(min(pos + removed, doc.characterCount() - 1), QTextCursor.KeepAnchor)
+            cur.insertText(ins)
+        text = doc.toPlainText()
+    return path, enc, text
+
+
+class RecoveryJournal(QObject):
+    """Owns this session's swap directory and finds the ones left behind by crashed sessions.
+
+    Every session writes under <dir>/<session id>/ and holds <dir>/<session id>.lock; a lock
+    that can be taken belongs to a session that is no longer running.
+    """
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.root = Path(directory)
+        self.session = uuid.uuid4().hex
+        self.dir = self.root / self.session
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = QLockFile(str(self.root / f"{self.session}.lock")); self._lock.setStaleLockTime(0)
+        self._lock.tryLock(0)
+        self._journals = {}
+
+    def attach(self, editor):
+        """Journal the editor's buffer (once, however many views it has)."""
+        buf = editor.buffer
+        if buf in self._journals: return
+        self._journals[buf] = SwapJournal(buf, self.dir, self)
+        buf.released.connect(self._detach)
+
+    def _detach(self, buf):
+        j = self._journals.pop(buf, None)
+        try:
+            if j: j.drop(); j.deleteLater()
+        except RuntimeError: pass   # the window (and the journal with it) is going away
+
+    def orphans(self):
+        """Swap files of crashed sessions, as (session dir, lock, [swap paths])."""
+        out = []
+        for d in self.root.iterdir() if self.root.is_dir() else ():
+            if not d.is_dir() or d.name == self.session: continue
+            lock = QLockFile(str(self.root / f"{d.name}.lock")); lock.setStaleLockTime(0)
+            if not lock.tryLock(0): continue   # still running
+            out.append((d, lock, sorted(str(p) for p in d.iterdir() if p.suffix in (".swap", ".swapz"))))
+        return out
+
+    @staticmethod
+    def discard(orphan):
+        d, lock, _ = orphan
+        shutil.rmtree(d, ignore_errors=True); lock.unlock()
+
+    def shutdown(self):
+        """Clean exit: nothing to recover next time."""
+        for j in list(self._journals.values()):
+            j.drop()
+            try: j.doc.contentsChange.disconnect(j._changed); j.doc.modificationChanged.disconnect(j._modified)
+            except (RuntimeError, TypeError): pass
+        self._journals.clear()
+        swap_writer().submit(lambda: None).result()
+        shutil.rmtree(self.dir, ignore_errors=True); self._lock.unlock()
@@ -0,0 +1,128 @@
+
+import os, time, difflib, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from core.fileio import atomic_write_text
+from core.file_loader import decode
+
+
+class FileEdit:
+    __slots__ = ("path", "count", "diff", "new_text", "mtime_ns", "in_editor", "encoding")
+
+    def __init__(self, path, count, diff, new_text, mtime_ns, in_editor, encoding="utf-8"):
+        self.path = path; self.count = count; self.diff = diff
+        self.new_text = new_text; self.mtime_ns = mtime_ns; self.in_editor = in_editor
+        self.encoding = encoding   # the file's, as detected on reading; used to write it back
+
+
+class _PoolJob(QObject):
+    """Runs the subclass's `_work(item)` for every item on a thread pool; non-None results are collected."""
+    progress = pyqtSignal(int, int)    # done, total
+    finished = pyqtSignal(list)
+
+    def __init__(self, items, workers=None):
+        super().__init__()
+        self.items = list(items)
+        self.workers = workers or min(32, (os.cpu_count() or 4) + 4)
+        self._cancel = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _emit(self, sig, *args):
+        try: sig.emit(*args)
+        except RuntimeError: pass
+
+    def _run(self):
+        out = []; done = 0; last = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futs = [pool.submit(self._work, it) for it in self.items]
+            for fut in as_completed(futs):
+                if self._cancel.is_set():
+                    for f in futs: f.cancel()
+                    break
+                done += 1
+                res = fut.result()
+                if res is not None: out.append(res)
+                if time.monotonic() - last > 0.1:
+                    self._emit(self.progress, done, len(self.items)); last = time.monotonic()
+        self._emit(self.progress, done, len(self.items))
+        self._emit(self.finished, [] if self._cancel.is_set() else out)
+
+
+class ReplaceJob(_PoolJob):
+    """Computes the replacement and a unified diff for every file, without touching disk."""
+
+    def __init__(self, paths, matcher, replacement, editor_texts: dict = None):
+        super().__init__(paths)
+        self.matcher = matcher
+        self.replacement = replacement
+        self.editor_texts = editor_texts or {}   # path -> text snapshot of an open editor
+
+    def _work(self, path):
+        if self._cancel.is_set(): return None
+        in_editor = path in self.editor_texts
+        mtime_ns = None; enc = "utf-8"
+        if in_editor:
+            old = self.editor_texts[path]
+        else:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                with open(path, "rb") as f:
+                    decoded = decode(f.read())   # same encoding detection as opening the file
+            except OSError:
+                return None
+            if decoded is None: return None   # binary
+            old, enc = decoded
+        repl = self.replacement
+        new, n = self.matcher.subn(repl if callable(repl) else (lambda m: repl), old)
+        if not n: return None
+        diff = "".join(difflib.unified_diff(old.splitlines(True), new.splitlines(True),
+                                            fromfile=path, tofile=path, n=1))
+        return FileEdit(path, n, diff, None if in_editor else new, mtime_ns, in_editor, enc)
+
+
+class WriteJob(_PoolJob):
+    """Writes FileEdits atomically; files changed on disk since the preview are skipped."""
+
+    def _work(self, edit):
+        if self._cancel.is_set(): return None
+        try:
+            if os.stat(edit.path).st_mtime_ns != edit.mtime_ns:
+                return (edit.path, "changed on disk since preview")
+            atomic_write_text(edit.path, edit.new_text, encoding=edit.encoding)
+            return (edit.path, None)
+        except Exception as e:
+            return (edit.path, str(e))
+
+
+def _utf16_len(s: str) -> int:
+    return len(s) if s.isascii() else len(s.encode("utf-16-le")) // 2
+
+
+def patch_editor(editor, matcher, replacement) -> int:
+    """Apply the replacement inside an open editor as one undoable edit, keeping cursor and scroll.
+
+    `replacement` is a string or a callable taking the match, as for `re.sub`.
+    """
+    text = editor.toPlainText()
+    # QTextDocument positions count UTF-16 code units, not Python characters
+    spans = []; prev = off = 0
+    for m in matcher.finditer(text):
+        a, b = m.span()
+        off += _utf16_len(text[prev:a]); start = off
+        off += _utf16_len(text[a:b]); prev = b
+        spans.append((start, off, replacement(m) if callable(replacement) else replacement))
+    if not spans: return 0
+    cur = QTextCursor(editor.document())
+    cur.beginEditBlock()
+    for a, b, new in reversed(spans):
+        cur.setPosition(a)
+        cur.setPosition(b, QTextCursor.KeepAnchor)
+        cur.insertText(new)
+    cur.endEditBlock()
+    return len(spans)
@@ -0,0 +1,78 @@
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PyQt5.QtCore import QObject, pyqtSignal
+from core.fileio import atomic_write_many
+
+
+class SaveService(QObject):
+    """Saves editors off the GUI thread.
+
+    Text is snapshotted on the GUI thread; one worker writes batches in submission order
+    (temp file + rename, optionally fsync'd per batch). An editor is marked unmodified only
+    if it was not edited while its snapshot was being written.
+    """
+    saved = pyqtSignal(object, object)         # editor, path
+    failed = pyqtSignal(object, object, str)   # editor, path, error
+    _done = pyqtSignal(object, object)         # batch, errors (worker -> GUI thread)
+
+    def __init__(self, parent=None, fsync=False):
+        super().__init__(parent)
+        self.fsync = fsync
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aduska-save")
+        self._busy = set()    # editors with a write in flight
+        self._done.connect(self._on_done)
+
+    def is_busy(self, editor):
+        return editor in self._busy
+
+    def save(self, editors, then=None):
+        """Queue `editors` (with file_path set) for writing; `then(ok)` runs on the GUI thread after."""
+        batch = []
+        for ed in editors:
+            batch.append((ed, Path(ed.file_path), ed.toPlainText(), getattr(ed, "encoding", "utf-8"),
+                          ed.document()))
+            self._busy.add(ed)
+        if not batch:
+            if then: then(True)
+            return
+        items = [(str(p), text, enc) for _, p, text, enc, _ in batch]
+        # the worker only sees `items`; the document outlives the view if the file is open twice
+        batch = [(ed, p, doc, doc.revision()) for ed, p, _, _, doc in batch]
+        self._pool.submit(self._write, batch, items, then)
+
+    def save_from(self, owner, path, read, then=None):
+        """Queue writing what `read()` returns as (text, encoding), called on the worker: for tabs
+        whose text is not in an editor (hibernated ones). saved/failed are emitted with `owner`."""
+        self._busy.add(owner)
+        self._pool.submit(self._write_from, owner, Path(path), read, then)
+
+    def _write_from(self, owner, path, read, then):
+        try: text, enc = read(); errors = atomic_write_many([(str(path), text, enc)], self.fsync)
+        except Exception as e: errors = [str(e)]
+        try: self._done.emit(([(owner, path, None, None)], then), errors)
+        except RuntimeError: pass
+
+    def _write(self, batch, items, then):
+        try: errors = atomic_write_many(items, self.fsync)
+        except Exception as e: errors = [str(e)] * len(items)
+        try: self._done.emit((batch, then), errors)
+        except RuntimeError: pass
+
+    def _on_done(self, job, errors):
+        batch, then = job
+        ok = True
+        for (ed, path, doc, rev), err in zip(batch, errors):
+            self._busy.discard(ed)
+            if doc is not None:
+                try: doc.revision()
+                except RuntimeError: continue   # closed meanwhile
+            if err:
+                ok = False; self.failed.emit(ed, path, err); continue
+            if doc is not None and doc.revision() == rev: doc.setModified(False)
+            self.saved.emit(ed, path)
+        if then: then(ok)
+
+    def wait(self):
+        """Block until every queued write has hit the disk (used on shutdown)."""
+        self._pool.submit(lambda: None).result()
@@ -0,0 +1,222 @@
+
+import os, time, threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from PyQt5.QtCore import Qt, QObject, QAbstractItemModel, QModelIndex, pyqtSignal
+from core.search_filter import FileFilter, build_matcher, looks_binary
+
+
+class SearchJob(QObject):
+    """Workspace search running on a thread pool; hits are streamed back in batches.
+
+    `text` is the literal used to query the trigram index (None for regex searches);
+    `matcher` is the one compiled pattern every line is tested against.
+    """
+    hits = pyqtSignal(list)                  # [(path, array('I') of line numbers), ...]
+    progress = pyqtSignal(int, int, float)   # files scanned, hits, elapsed seconds
+    finished = pyqtSignal(bool)              # True if cancelled
+
+    BATCH_SEC = 0.1
+
+    def __init__(self, root, text: str, workers: int = None, index=None, max_hits: int = 0,
+                 matcher=None, file_filter: FileFilter = None):
+        super().__init__()
+        self.root = str(root)
+        self.text = text
+        self.matcher = matcher or build_matcher(text)
+        self.filter = file_filter or FileFilter()
+        self.index = index if text else None
+        self.max_hits = max_hits
+        self.capped = False
+        self.workers = workers or min(32, (os.cpu_count() or 4) + 4)
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="aduska-search", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def _iter_files(self):
+        idx = self.index
+        if idx is not None and (idx.is_building() or not idx.is_warm()):
+            # building the index reads every file: stream this search from the walk meanwhile
+            idx.build_in_background(); idx = None
+        if idx is not None:
+            # only files whose trigrams cover the query can match
+            t0 = time.monotonic()
+            if not idx.refresh(self._cancel, lambda n: self._emit(self.progress, n, 0, time.monotonic() - t0)): return
+            cut = len(self.root.rstrip(os.sep)) + 1
+            for p in idx.candidates(self.text):
+                if self.filter.accept_path(p[cut:].replace(os.sep, "/")): yield p
+            return
+        for p, _ in self.filter.walk(self.root, self._cancel):
+            yield p
+
+    def _scan(self, path):
+        if self._cancel.is_set(): return None
+        flt = self.filter
+        try:
+            with open(path, "rb") as f:
+                if flt.max_size and os.fstat(f.fileno()).st_size > flt.max_size: return None
+                raw = f.read()
+        except Exception:
+            return None
+        if flt.skip_binary and looks_binary(raw): return None
+        data = raw.decode("utf-8", errors="ignore")
+        search = self.matcher.search
+        if not search(data):
+            return None
+        lines = array("I", (ln for ln, line in enumerate(data.splitlines(), 1) if search(line)))
+        return (path, lines) if lines else None
+
+    def _emit(self, sig, *args):
+        # the dock may already be gone when a cancelled job winds down
+        try: sig.emit(*args)
+        except RuntimeError: pass
+
+    def _run(self):
+        t0 = last = time.monotonic()
+        scanned = nhits = 0
+        batch = []
+        files = self._iter_files()
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aduska-scan") as pool:
+            # keep a bounded window of in-flight files instead of queueing the whole tree
+            window = self.workers * 4
+            exhausted = False
+            while not self._cancel.is_set():
+                while not exhausted and len(pending) < window:
+                    path = next(files, None)
+                    if path is None: exhausted = True; break
+                    pending.add(pool.submit(self._scan, path))
+                if not pending: break
+                done, pending = wait(pending, timeout=self.BATCH_SEC, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    scanned += 1
+                    res = fut.result()
+                    if not res or self.capped: continue
+                    path, lines = res
+                    if self.max_hits and nhits + len(lines) >= self.max_hits:
+                        lines = lines[:self.max_hits - nhits]
+                        self.capped = True; self._cancel.set()
+                    batch.append((path, lines)); nhits += len(lines)
+                now = time.monotonic()
+                if now - last >= self.BATCH_SEC:
+                    if batch: self._emit(self.hits, batch); batch = []
+                    self._emit(self.progress, scanned, nhits, now - t0)
+                    last = now
+            for fut in pending: fut.cancel()
+        cancelled = self._cancel.is_set() and not self.capped
+        if batch and not cancelled: self._emit(self.hits, batch)
+        self._emit(self.progress, scanned, nhits, time.monotonic() - t0)
+        self._emit(self.finished, cancelled)
+        if self.index is not None and not cancelled:
+            self.index.save()
+
+
+class SearchResultsModel(QAbstractItemModel):
+    """Two-level model (file -> hits) over flat arrays; preview text is read lazily.
+
+    A hit costs one array slot for its line number. Preview lines are fetched from
+    disk only when the view asks for them, i.e. for rows that are actually visible.
+    """
+    PREVIEW_FILES = 16
+
+    def __init__(self, root="", parent=None):
+        super().__init__(parent)
+        self.root = str(root)
+        self._paths = []                # file row -> path
+        self._starts = array("I")       # file row -> first slot in _lines
+        self._counts = array("I")       # file row -> number of hits
+        self._lines = array("I")        # hit slots: line numbers
+        self._preview = OrderedDict()   # path -> list of lines (small LRU)
+
+    def clear(self, root=None):
+        self.beginResetModel()
+        if root is not None: self.root = str(root)
+        self._paths = []; self._starts = array("I"); self._counts = array("I"); self._lines = array("I")
+        self._preview.clear()
+        self.endResetModel()
+
+    def add_hits(self, batch):
+        if not batch: return
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for path, lines in batch:
+            self._paths.append(path)
+            self._starts.append(len(self._lines)); self._counts.append(len(lines))
+            self._lines.extend(lines)
+        self.endInsertRows()
+
+    def hit_count(self):
+        return len(self._lines)
+
+    def paths(self):
+        return list(self._paths)
+
+    def location(self, index: QModelIndex):
+        """(path, line) for a hit row, (path, first hit line) for a file row."""
+        if not index.isValid(): return None
+        fr = index.internalId() - 1 if index.internalId() else index.row()
+        slot = self._starts[fr] + (index.row() if index.internalId() else 0)
+        return self._paths[fr], self._lines[slot]
+
+    def _line_text(self, path, ln):
+        lines = self._preview.get(path)
+        if lines is None:
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    lines = f.read().splitlines()
+            except Exception:
+                lines = []
+            self._preview[path] = lines
+            if len(self._preview) > self.PREVIEW_FILES:
+                self._preview.popitem(last=False)
+        else:
+            self._preview.move_to_end(path)
+        return lines[ln - 1].strip() if 0 < ln <= len(lines) else ""
+
+    # ---------- QAbstractItemModel ----------
+    # internalId 0 marks a file row; a hit row stores its file row + 1
+    def index(self, row, column, parent=QModelIndex()):
+        if column != 0 or row < 0: return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, 0, 0) if row < len(self._paths) else QModelIndex()
+        if parent.internalId(): return QModelIndex()
+        if row >= self._counts[parent.row()]: return QModelIndex()
+        return self.createIndex(row, 0, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or not index.internalId(): return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid(): return len(self._paths)
+        if parent.internalId(): return 0
+        return self._counts[parent.row()]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self.rowCount(parent) > 0
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid(): return None
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole): return None
+        if not index.internalId():
+            path = self._paths[index.row()]
+            if role == Qt.ToolTipRole: return path
+            rel = os.path.relpath(path, self.root) if self.root else path
+            return f"{rel}  ({self._counts[index.row()]})"
+        fr = index.internalId() - 1
+        ln = self._lines[self._starts[fr] + index.row()]
+        if role == Qt.ToolTipRole: return f"{self._paths[fr]}:{ln}"
+        return f"{ln}:  {self._line_text(self._paths[fr], ln)}"
@@ -0,0 +1,149 @@
+
+import os, re, fnmatch
+
+DEFAULT_EXCLUDE_DIRS = {
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", "env", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea", ".vscode", "dist", "build", "target",
+}
+SNIFF_BYTES = 8192
+
+
+def build_matcher(text: str, regex=False, case=False, word=False):
+    """One compiled pattern per search; raises re.error for a bad regex."""
+    pat = text if regex else re.escape(text)
+    if word:
+        pat = rf"(?<!\w)(?:{pat})(?!\w)"
+    flags = re.MULTILINE | (0 if case else re.IGNORECASE)
+    return re.compile(pat, flags)
+
+
+def looks_binary(head: bytes) -> bool:
+    return b"\0" in head[:SNIFF_BYTES]
+
+
+def _glob_to_regex(pat: str) -> str:
+    out = []; i = 0
+    while i < len(pat):
+        c = pat[i]
+        if pat.startswith("**/", i):
+            out.append("(?:.*/)?"); i += 3; continue
+        if pat.startswith("**", i):
+            out.append(".*"); i += 2; continue
+        if c == "*": out.append("[^/]*")
+        elif c == "?": out.append("[^/]")
+        elif c == "[":
+            j = pat.find("]", i + 1)
+            if j < 0: out.append(re.escape(c))
+            else:
+                body = pat[i+1:j]
+                if body.startswith("!"): body = "^" + body[1:]
+                out.append(f"[{body}]"); i = j
+        else: out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class GitIgnore:
+    """Subset of .gitignore semantics: negation, dir-only, anchored and ** patterns, nested files."""
+
+    def __init__(self):
+        self.rules = []   # (base_rel, compiled, negate, dir_only)
+
+    def add_file(self, path, base_rel=""):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"): continue
+            negate = line.startswith("!")
+            if negate: line = line[1:]
+            if line.startswith("\\"): line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            body = _glob_to_regex(line.lstrip("/"))
+            rx = re.compile(("" if anchored else "(?:.*/)?") + body + "$")
+            self.rules.append((base_rel, rx, negate, dir_only))
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        result = False
+        for base, rx, negate, dir_only in self.rules:
+            if dir_only and not is_dir: continue
+            if base:
+                if not rel.startswith(base + "/"): continue
+                sub = rel[len(base) + 1:]
+            else:
+                sub = rel
+            if rx.match(sub): result = not negate
+        return result
+
+
+class FileFilter:
+    """Decides which files a search (or the trigram index) ever opens."""
+
+    def __init__(self, include=(), exclude=(), use_gitignore=True, max_size=2 * 1024 * 1024,
+                 skip_binary=True, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+        self.include = [g for g in include if g]
+        self.exclude = [g for g in exclude if g]
+        self.use_gitignore = use_gitignore
+        self.max_size = max_size
+        self.skip_binary = skip_binary
+        self.exclude_dirs = set(exclude_dirs)
+
+    def signature(self):
+        """What the index depends on (glob lists are applied per search, not indexed)."""
+        return (self.use_gitignore, self.max_size, self.skip_binary, tuple(sorted(self.exclude_dirs)))
+
+    @staticmethod
+    def _glob_hit(globs, rel, name):
+        for g in globs:
+            if fnmatch.fnmatch(rel if "/" in g else name, g): return True
+        return False
+
+    def accept(self, rel: str) -> bool:
+        name = rel.rsplit("/", 1)[-1]
+        if self.exclude and self._glob_hit(self.exclude, rel, name): return False
+        if self.include and not self._glob_hit(self.include, rel, name): return False
+        return True
+
+    def _dir_excluded(self, rel: str, name: str) -> bool:
+        return bool(self.exclude) and self._glob_hit(self.exclude, rel, name)
+
+    def accept_path(self, rel: str) -> bool:
+        """accept() plus the exclude globs on every parent directory, as walk() prunes them:
+        for files that come from somewhere else than walk() (the trigram index)."""
+        parts = rel.split("/")
+        for i in range(1, len(parts)):
+            if self._dir_excluded("/".join(parts[:i]), parts[i - 1]): return False
+        return self.accept(rel)
+
+    def walk(self, root, cancel=None, on_dir=None):
+        """Yield (abs_path, rel_path) for every file that is not pruned by dirs, .gitignore or globs.
+
+        `on_dir(abs_dir)` is called for every directory that is descended into.
+        """
+        root = str(root)
+        gi = GitIgnore() if self.use_gitignore else None
+        for p, dirs, files in os.walk(root):
+            if cancel is not None and cancel.is_set(): return
+            if on_dir is not None: on_dir(p)
+            rel_dir = os.path.relpath(p, root).replace(os.sep, "/")
+            rel_dir = "" if rel_dir == "." else rel_dir
+            if gi is not None and ".gitignore" in files:
+                gi.add_file(os.path.join(p, ".gitignore"), rel_dir)
+            keep = []
+            for d in dirs:
+                if d in self.exclude_dirs: continue
+                rel = f"{rel_dir}/{d}" if rel_dir else d
+                if gi is not None and gi.ignored(rel, True): continue
+                if self._dir_excluded(rel, d): continue
+                keep.append(d)
+            dirs[:] = keep
+            for fn in files:
+                rel = f"{rel_dir}/{fn}" if rel_dir else fn
+                if gi is not None and gi.ignored(rel, False): continue
+                if not self.accept(rel): continue
+                yield os.path.join(p, fn), rel
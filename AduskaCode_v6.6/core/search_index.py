@@ -0,0 +1,188 @@
+
+import os, time, pickle, hashlib, threading
+from pathlib import Path
+from core.search_filter import FileFilter, looks_binary
+
+INDEX_VERSION = 2
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Persistent per-workspace trigram index keyed by (path, mtime, size).
+
+    Postings map a lowercased trigram to the ids of the files containing it. A changed
+    file gets a fresh id and the old one is just marked dead, so updates never have to
+    walk the postings; dead ids are dropped when the index is compacted on save.
+    Only files passing `file_filter` are tracked; binary and oversized ones are kept
+    with fid -2 so they are never read again until they change.
+    """
+    MAX_FILE_SIZE = 8 * 1024 * 1024   # bigger files are never indexed, always scanned
+
+    def __init__(self, root, cache_dir, file_filter: FileFilter = None):
+        self.root = str(root)
+        self.filter = file_filter or FileFilter()
+        # one cache file per (root, filter) pair, like the in-memory indexes, so they don't overwrite each other
+        key = hashlib.sha1(f"{os.path.abspath(self.root)}\0{self.filter.signature()!r}".encode("utf-8")).hexdigest()[:16]
+        self.path = Path(cache_dir) / f"{key}.trigrams"
+        self.files = {}        # path -> (mtime_ns, size, fid); -1 = not indexed, -2 = skipped
+        self.postings = {}     # trigram -> set(fid)
+        self.next_fid = 0
+        self.dead = 0
+        self._dirty_paths = set()
+        self._changed = False
+        self._walked = False   # a full refresh has completed
+        self._loaded = False
+        self._lock = threading.RLock()           # files / postings; held only while changing or querying them
+        self._refresh_lock = threading.Lock()    # one refresh (tree walk, file reads) at a time
+        self._dirty_lock = threading.Lock()      # _dirty_paths; taken by invalidate() on the GUI thread
+
+    # ---------- persistence ----------
+    def load(self):
+        with self._lock:
+            if self._loaded: return
+            self._loaded = True
+            try:
+                with open(self.path, "rb") as f:
+                    data = pickle.load(f)
+                if (data.get("version") != INDEX_VERSION or data.get("root") != self.root
+                        or data.get("filter") != self.filter.signature()):
+                    return
+                self.files, self.postings = data["files"], data["postings"]
+                self.next_fid, self.dead = data["next_fid"], data["dead"]
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print("[SEARCH] index load failed:", e)
+
+    def save(self):
+        with self._lock:
+            if not self._changed: return
+            if self.dead > max(1024, len(self.files)):
+                self._compact()
+            data = {"version": INDEX_VERSION, "root": self.root, "filter": self.filter.signature(), "files": self.files,
+                    "postings": self.postings, "next_fid": self.next_fid, "dead": self.dead}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self.path)
+                self._changed = False
+            except Exception as e:
+                print("[SEARCH] index save failed:", e)
+
+    def _compact(self):
+        live = {fid for (_, _, fid) in self.files.values() if fid >= 0}
+        postings = {}
+        for g, ids in self.postings.items():
+            ids &= live
+            if ids: postings[g] = ids
+        self.postings = postings
+        self.dead = 0
+
+    # ---------- updates ----------
+    def invalidate(self, path):
+        """Force `path` to be re-checked on the next refresh (e.g. after a save)."""
+        with self._dirty_lock:
+            self._dirty_paths.add(str(path))
+
+    def _drop(self, path):
+        # caller holds _lock
+        old = self.files.pop(path, None)
+        if old and old[2] >= 0:
+            self.dead += 1
+        self._changed = True
+
+    def _add(self, path, st):
+        # the file is read without the lock, so queries and invalidate() never wait for disk I/O
+        fid, grams = -1, None
+        if self.filter.max_size and st.st_size > self.filter.max_size:
+            fid = -2
+        elif st.st_size <= self.MAX_FILE_SIZE:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            except Exception:
+                with self._lock: self._drop(path)
+                return
+            if self.filter.skip_binary and looks_binary(raw): fid = -2
+            else: grams = trigrams(raw.decode("utf-8", errors="ignore").lower())
+        with self._lock:
+            self._drop(path)
+            if grams is not None:
+                fid = self.next_fid; self.next_fid += 1
+                postings = self.postings
+                for g in grams:
+                    ids = postings.get(g)
+                    if ids is None: postings[g] = {fid}
+                    else: ids.add(fid)
+            self.files[path] = (st.st_mtime_ns, st.st_size, fid)
+
+    def _update(self, path):
+        # only refresh() changes `files`, and refreshes are serialized, so it can be read here unlocked
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock: self._drop(path)
+            return
+        old = self.files.get(path)
+        if old is None or old[0] != st.st_mtime_ns or old[1] != st.st_size:
+            self._add(path, st)
+
+    def refresh(self, cancel: threading.Event = None, on_progress=None):
+        """Bring the index up to date: a stat walk of the tree, reading only changed files.
+
+        `on_progress(files checked)` is called about every 0.1 s from the refreshing thread.
+        """
+        with self._refresh_lock:
+            self.load()
+            with self._dirty_lock:
+                dirty, self._dirty_paths = self._dirty_paths, set()
+            for p in dirty:
+                self._update(p)
+            seen = set(); last = time.monotonic()
+            for fp, _ in self.filter.walk(self.root, cancel):
+                seen.add(fp)
+                self._update(fp)
+                if on_progress is not None and time.monotonic() - last >= 0.1:
+                    on_progress(len(seen)); last = time.monotonic()
+            if cancel is not None and cancel.is_set(): return False
+            with self._lock:
+                for fp in [fp for fp in self.files if fp not in seen]:
+                    self._drop(fp)
+            self._walked = True
+            return True
+
+    def is_warm(self):
+        """True once there is something to refresh: a cache was loaded or a full refresh completed.
+        A cold index reads every file on its first refresh."""
+        self.load()
+        with self._lock:
+            return self._walked or bool(self.files)
+
+    def is_building(self):
+        return self._refresh_lock.locked()
+
+    def build_in_background(self):
+        """Refresh (and save) on a thread of its own, unless a refresh is already running."""
+        if self.is_building(): return
+        def build():
+            if self.refresh(): self.save()
+        threading.Thread(target=build, name="aduska-index-build", daemon=True).start()
+
+    # ---------- queries ----------
+    def candidates(self, text: str):
+        """Paths that may contain `text` (case-insensitive); unindexed files are always included."""
+        with self._lock:
+            needle = text.lower()
+            paths = [(p, fid) for p, (_, _, fid) in self.files.items() if fid != -2]
+            if len(needle) < 3:
+                return sorted(p for p, _ in paths)
+            ids = None
+            for g in sorted(trigrams(needle), key=lambda g: len(self.postings.get(g, ()))):
+                ids = set(self.postings.get(g, ())) if ids is None else ids & self.postings.get(g, set())
+                if not ids: break
+            return sorted(p for p, fid in paths if fid < 0 or fid in ids)
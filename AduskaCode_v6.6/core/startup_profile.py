@@ -0,0 +1,136 @@
+
+import json, time
+_T0 = time.perf_counter()   # before the Qt imports below, so they count towards "imports"
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from PyQt5.QtCore import Qt, QStandardPaths, QTimer, QUrl
+from PyQt5.QtGui import QDesktopServices
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem, QLabel,
+                             QPushButton, QApplication)
+
+FLAG = "--profile-startup"
+HISTORY = 50     # runs kept in history.jsonl
+
+_active = None
+
+
+class StartupProfiler:
+    """Wall-clock timings of nested startup phases, relative to the start of the process' imports."""
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.records = []    # [depth, name, start offset, seconds]
+        self._depth = 0
+
+    @contextmanager
+    def phase(self, name):
+        rec = [self._depth, name, time.perf_counter() - self.t0, 0.0]
+        self.records.append(rec); self._depth += 1
+        try: yield
+        finally:
+            rec[3] = time.perf_counter() - self.t0 - rec[2]; self._depth -= 1
+
+    def record(self, name, since=None):
+        """Add a phase that ran from `since` (a perf_counter value, default the profiler start) until now."""
+        start = (self.t0 if since is None else since) - self.t0
+        self.records.append([self._depth, name, start, time.perf_counter() - self.t0 - start])
+
+    def keys(self):
+        """(key, depth, name, start, seconds) with keys made unique by their parent phases."""
+        out, stack = [], []
+        for depth, name, start, sec in self.records:
+            del stack[depth:]; stack.append(name)
+            out.append(("/".join(stack), depth, name, start, sec))
+        return out
+
+    def report(self) -> str:
+        lines = [f"AduskaCode startup profile, {time.strftime('%Y-%m-%d %H:%M:%S')}", ""]
+        lines.append(f"{'start ms':>9}  {'ms':>9}  phase")
+        for _, depth, name, start, sec in self.keys():
+            lines.append(f"{start * 1000:9.1f}  {sec * 1000:9.1f}  {'  ' * depth}{name}")
+        return "\n".join(lines) + "\n"
+
+
+def begin(enabled=True):
+    global _active
+    _active = StartupProfiler(_T0) if enabled else None
+    return _active
+
+
+def active():
+    return _active
+
+
+def phase(name):
+    """Time a block as a startup phase; does nothing unless profiling."""
+    return _active.phase(name) if _active else nullcontext()
+
+
+def record(name, since=None):
+    if _active: _active.record(name, since)
+
+
+def record_when_idle(name):
+    """Record the time from now until the event loop gets to run."""
+    if _active: QTimer.singleShot(0, lambda t=time.perf_counter(): record(name, t))
+
+
+def report_dir() -> Path:
+    return Path(QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)) / "startup"
+
+
+def finish(parent=None):
+    """Stop profiling, write the report (and a history entry) and show it."""
+    global _active
+    prof, _active = _active, None
+    if prof is None: return None
+    d = report_dir(); previous = {}
+    hist = d / "history.jsonl"
+    path = None
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        runs = hist.read_text(encoding="utf-8").splitlines() if hist.exists() else []
+        if runs: previous = json.loads(runs[-1]).get("phases", {})
+        path = d / f"startup-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        path.write_text(prof.report(), encoding="utf-8")
+        run = {"time": time.time(), "phases": {k: round(sec, 6) for k, _, _, _, sec in prof.keys()}}
+        runs = (runs + [json.dumps(run)])[-HISTORY:]
+        hist.write_text("\n".join(runs) + "\n", encoding="utf-8")
+    except (OSError, ValueError) as e:
+        print("[PROFILE] could not write report:", e)
+    print(prof.report())
+    dlg = StartupReportDialog(prof, previous, path, parent)
+    dlg.show()
+    return dlg
+
+
+class StartupReportDialog(QDialog):
+    """The phases of this startup, with the previous profiled run's timings for comparison."""
+
+    def __init__(self, prof, previous: dict, path=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Startup Profile"); self.resize(640, 480)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.prof = prof
+        lay = QVBoxLayout(self)
+        lay.addWidget(QLabel(f"Report: {path}" if path else "The report could not be written."))
+        self.tree = QTreeWidget(); self.tree.setHeaderLabels(["Phase", "Start ms", "ms", "Previous ms", "Δ ms"])
+        items = []
+        for key, depth, name, start, sec in prof.keys():
+            prev = previous.get(key)
+            cols = [name, f"{start * 1000:.1f}", f"{sec * 1000:.1f}",
+                    "" if prev is None else f"{prev * 1000:.1f}", "" if prev is None else f"{(sec - prev) * 1000:+.1f}"]
+            it = QTreeWidgetItem(cols)
+            for c in range(1, 5): it.setTextAlignment(c, Qt.AlignRight | Qt.AlignVCenter)
+            del items[depth:]
+            (items[-1].addChild(it) if items else self.tree.addTopLevelItem(it))
+            items.append(it)
+        self.tree.expandAll()
+        for c in range(5): self.tree.resizeColumnToContents(c)
+        lay.addWidget(self.tree)
+        row = QHBoxLayout(); row.addStretch(1)
+        btn_copy = QPushButton("Copy"); btn_copy.clicked.connect(lambda: QApplication.clipboard().setText(prof.report()))
+        btn_dir = QPushButton("Open Folder"); btn_dir.clicked.connect(lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(str(report_dir()))))
+        btn_close = QPushButton("Close"); btn_close.clicked.connect(self.close)
+        for b in (btn_copy, btn_dir, btn_close): row.addWidget(b)
+        lay.addLayout(row)
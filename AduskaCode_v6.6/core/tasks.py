@@ -0,0 +1,205 @@
+
+import os, pickle, inspect, itertools, threading, traceback, importlib.util
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, CancelledError
+from PyQt5.QtCore import QObject, pyqtSignal
+
+CANCEL_SLOTS = 4096   # cancel flags shared with worker processes: at most this many process tasks at once
+
+
+class TaskControl:
+    """Handed to a task function that takes a `task` argument: report progress, poll for cancellation."""
+
+    def __init__(self, task_id, report, is_cancelled):
+        self.id = task_id
+        self._report = report
+        self._is_cancelled = is_cancelled
+
+    def progress(self, value):
+        """Send `value` (e.g. a percentage) to the task's on_progress on the GUI thread."""
+        self._report(self.id, value)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._is_cancelled()
+
+
+def _wants_task(fn):
+    try: return "task" in inspect.signature(fn).parameters
+    except (TypeError, ValueError): return False
+
+
+# ---- process side -------------------------------------------------------------
+
+_child = {}   # in worker processes: progress queue, cancel flags, modules loaded from extension files
+
+
+def _child_init(queue, flags):
+    _child["queue"], _child["flags"] = queue, flags
+
+
+def _child_call(task_id, slot, fn, args, kwargs, wants_task):
+    if isinstance(fn, tuple):   # (file, qualified name) of a function in an extension's main.py
+        path, qualname = fn
+        mod = _child.get(path)
+        if mod is None:
+            spec = importlib.util.spec_from_file_location(f"_aduska_task_{abs(hash(path))}", path)
+            mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+            _child[path] = mod
+        fn = mod
+        for part in qualname.split("."): fn = getattr(fn, part)
+    if wants_task:
+        flags = _child["flags"]
+        kwargs = dict(kwargs, task=TaskControl(task_id, lambda i, v: _child["queue"].put((i, v)),
+                                               lambda: bool(flags[slot])))
+    return fn(*args, **kwargs)
+
+
+def _picklable(fn):
+    """`fn` as sent to a worker process: itself, or (file, qualname) for functions of extension
+    modules, which are loaded from a file and cannot be imported by name."""
+    try:
+        pickle.dumps(fn); return fn
+    except Exception:
+        code = getattr(fn, "__code__", None)
+        if code is None or "<locals>" in fn.__qualname__ or not os.path.isfile(code.co_filename): raise
+        return (code.co_filename, fn.__qualname__)
+
+
+# ---- GUI side -----------------------------------------------------------------
+
+class Task(QObject):
+    """A job running in the background. Its signals arrive on the GUI thread; after cancel()
+    neither finished nor failed is emitted."""
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object)    # the function's return value
+    failed = pyqtSignal(str)         # formatted exception
+    cancelled = pyqtSignal()
+
+    def __init__(self, task_id, owner=None, parent=None):
+        super().__init__(parent)
+        self.id = task_id
+        self.owner = owner
+        self.future = None
+        self.slot = None   # cancel flag of a process task
+        self._cancelled = False
+        self._done = False
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def is_done(self):
+        return self._done
+
+    def cancel(self):
+        """Stop the task: dropped if it has not started, otherwise asked to stop (its `task.cancelled`
+        turns true) and its result ignored."""
+        if self._done or self._cancelled: return
+        self._cancelled = True
+        if self.future is not None: self.future.cancel()
+        self.cancelled.emit()
+
+
+class TaskRunner(QObject):
+    """Runs functions on a thread pool or a process pool and delivers results, errors and progress
+    to the GUI thread. Process workers are started (with "spawn", never forking the GUI) on first use."""
+    _finished = pyqtSignal(object, object, object)   # task, result, error text (worker -> GUI thread)
+    _progress = pyqtSignal(object, object)           # task id, value
+
+    def __init__(self, parent=None, threads=None):
+        super().__init__(parent)
+        self._threads = ThreadPoolExecutor(max_workers=threads or min(8, (os.cpu_count() or 2) + 2),
+                                           thread_name_prefix="aduska-task")
+        self._processes = None
+        self._ids = itertools.count(1)
+        self._tasks = {}    # id -> running Task
+        self._flags = None
+        self._free_slots = []   # cancel flags not held by a running process task
+        self._queue = None
+        self._finished.connect(self._on_finished)
+        self._progress.connect(self._on_progress)
+
+    def run_in_thread(self, fn, *args, owner=None, **kwargs) -> Task:
+        """fn(*args, **kwargs) on a worker thread; a `task` parameter of fn gets a TaskControl."""
+        task = self._new(owner)
+        if _wants_task(fn):
+            kwargs["task"] = TaskControl(task.id, self._emit_progress, task.is_cancelled)
+        task.future = self._threads.submit(fn, *args, **kwargs)
+        task.future.add_done_callback(lambda f, t=task: self._collect(t, f))
+        return task
+
+    def run_in_process(self, fn, *args, owner=None, **kwargs) -> Task:
+        """fn(*args, **kwargs) in a worker process. fn and the arguments must be picklable; functions
+        defined at the top level of an extension's main.py are loaded there from the file."""
+        target = _picklable(fn)
+        pool = self._process_pool()
+        if not self._free_slots: raise RuntimeError(f"more than {CANCEL_SLOTS} process tasks at once")
+        task = self._new(owner)
+        # the task's own flag until it finishes, so a cancel can never reach another task
+        task.slot = slot = self._free_slots.pop(); self._flags[slot] = 0
+        task.future = pool.submit(_child_call, task.id, slot, target, args, kwargs, _wants_task(fn))
+        task.future.add_done_callback(lambda f, t=task: self._collect(t, f))
+        task.cancelled.connect(lambda s=slot: self._flags.__setitem__(s, 1))
+        return task
+
+    def _new(self, owner):
+        task = Task(next(self._ids), owner, self)
+        self._tasks[task.id] = task
+        return task
+
+    def _process_pool(self):
+        if self._processes is None:
+            ctx = mp.get_context("spawn")
+            self._queue = ctx.Queue(); self._flags = ctx.RawArray("b", CANCEL_SLOTS)
+            self._free_slots = list(range(CANCEL_SLOTS))
+            self._processes = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1), mp_context=ctx,
+                                                  initializer=_child_init, initargs=(self._queue, self._flags))
+            threading.Thread(target=self._pump_progress, args=(self._queue,), name="aduska-task-progress", daemon=True).start()
+        return self._processes
+
+    def _pump_progress(self, queue):
+        while True:
+            try: item = queue.get()
+            except (EOFError, OSError): return
+            if item is None: return
+            self._emit_progress(*item)
+
+    def _emit_progress(self, task_id, value):
+        try: self._progress.emit(task_id, value)
+        except RuntimeError: pass   # shutting down
+
+    def _collect(self, task, future):
+        # worker thread (or the caller's, if the future was already done)
+        try: result, error = future.result(), None
+        except CancelledError: result, error = None, None
+        except Exception as e:
+            result, error = None, "".join(traceback.format_exception(type(e), e, e.__traceback__)).rstrip()
+        try: self._finished.emit(task, result, error)
+        except RuntimeError: pass
+
+    def _on_finished(self, task, result, error):
+        self._tasks.pop(task.id, None)
+        if task.slot is not None: self._free_slots.append(task.slot); task.slot = None   # the worker is done with it
+        if not task.is_cancelled():
+            task._done = True
+            if error is None: task.finished.emit(result)
+            else: task.failed.emit(error)
+        task.deleteLater()
+
+    def _on_progress(self, task_id, value):
+        task = self._tasks.get(task_id)
+        if task is not None and not task.is_cancelled(): task.progress.emit(value)
+
+    def cancel_owner(self, owner):
+        """Cancel every task started by `owner` (an extension being unloaded)."""
+        for task in [t for t in self._tasks.values() if t.owner == owner]:
+            task.cancel(); self._tasks.pop(task.id, None)
+
+    def shutdown(self):
+        for task in list(self._tasks.values()): task.cancel()
+        self._tasks.clear()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            try: self._queue.put(None)
+            except (OSError, ValueError): pass